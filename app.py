@@ -31,6 +31,7 @@ NagSuppressions.add_stack_suppressions(network_stack, [ # for CDK NAG
 ])
 NagSuppressions.add_stack_suppressions(compute_stack, [ # for CDK NAG
     { "id": 'AwsSolutions-IAM5', "reason": '* required to grant create log group/log streams/put log streams.'},
+    { "id": 'AwsSolutions-ECS2', "reason": 'The optional evaluator worker receives table, bucket and queue names as environment variables, no secrets.'},
 ])
 NagSuppressions.add_stack_suppressions(api_stack, [ # for CDK NAG
     { "id": 'AwsSolutions-IAM5', "reason": '* required to grant create log group/log streams/put log streams. Also required for managing network interfaces to attach to VPC, access all objects within the web app S3 bucket, get API Gateway API key, run tasks within the evaluator task definition. '},
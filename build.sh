@@ -8,4 +8,11 @@ npm run build --prefix ui/
 # To download python dependencies required for creating the AWS Lambda Layer:
 rm -rf layers/python/
 mkdir layers/python/
-uv run pip install --no-deps -r layers/requirements.txt -t layers/python/.
+# orjson is a compiled package, so wheels are selected for the Lambda runtime rather than for this machine
+uv run pip install --no-deps -r layers/requirements.txt -t layers/python/. --platform manylinux2014_x86_64 --implementation cp --python-version 3.14 --only-binary=:all:
+cp lambda-ecs/shared/*.py layers/python/
+
+# To download the dependencies of the report export layer (pyarrow for Parquet), kept out of the shared layer because of its size:
+rm -rf layers-export/python/
+mkdir layers-export/python/
+uv run pip install --no-deps -r layers-export/requirements.txt -t layers-export/python/. --platform manylinux2014_x86_64 --implementation cp --python-version 3.14 --only-binary=:all:
@@ -1,5 +1,6 @@
 from aws_cdk import (
     Duration,
+    Size,
     Stack,
     aws_ec2 as ec2,
     RemovalPolicy,
@@ -33,6 +34,26 @@ class APIStack(Stack):
             compatible_runtimes=[_lambda.Runtime.PYTHON_3_14]
         )
 
+        # Create Lambda Layer for report exports, pyarrow writes Parquet and is too large for the shared layer
+        layer_export = _lambda.LayerVersion(self, f"{self.stack_name}-layer-export",
+            removal_policy=RemovalPolicy.DESTROY,
+            code=_lambda.Code.from_asset("./layers-export"),
+            compatible_architectures=[_lambda.Architecture.X86_64],
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_14]
+        )
+
+        # Single-table layout is optional (cdk.json context "single_table"), the data access module
+        # falls back to the per-entity tables when DDBTBL_DATA is empty
+        ddbtbl_data_name = storage_stack.ddbtbl_data.table_name if storage_stack.ddbtbl_data else ""
+        ddbtbl_data_arns = [storage_stack.ddbtbl_data.table_arn, f"{storage_stack.ddbtbl_data.table_arn}/index/*"] if storage_stack.ddbtbl_data else []
+
+        # Optional evaluator worker service (cdk.json context "evaluator_worker"), /evaluate starts an ECS task
+        # per evaluation when EVALUATION_QUEUE_URL is empty
+        evaluation_queue_url = compute_stack.evaluation_queue.queue_url if compute_stack.evaluation_queue else ""
+
+        # Optional single router function serving the proxy API routes (cdk.json context "api_router")
+        use_api_router = str(self.node.try_get_context("api_router")).lower() == "true"
+
         # Create Lambda Permission
         role_lambda = iam.Role(self, 
             f"{self.stack_name}-lambda_role",
@@ -65,6 +86,7 @@ class APIStack(Stack):
                                 "dynamodb:PutItem", 
                                 "dynamodb:DeleteItem", 
                                 "dynamodb:UpdateItem",
+                                "dynamodb:BatchWriteItem",
                                 "dynamodb:Scan",
                                 "dynamodb:Query",
                                 "dynamodb:GetItem",
@@ -72,8 +94,14 @@ class APIStack(Stack):
                             resources=[
                                 storage_stack.ddbtbl_evaluation_report.table_arn,
                                 storage_stack.ddbtbl_evaluation_report_questions.table_arn,
+                                f"{storage_stack.ddbtbl_evaluation_report_questions.table_arn}/index/*",
                                 storage_stack.ddbtbl_scenarios.table_arn,
-                                storage_stack.ddbtbl_scenario_questions.table_arn
+                                f"{storage_stack.ddbtbl_scenarios.table_arn}/index/*",
+                                storage_stack.ddbtbl_scenario_questions.table_arn,
+                                f"{storage_stack.ddbtbl_scenario_questions.table_arn}/index/*",
+                                storage_stack.ddbtbl_score_rollups.table_arn,
+                                storage_stack.ddbtbl_rate_limits.table_arn,
+                                *ddbtbl_data_arns
                             ]
                         )
                     ]
@@ -120,10 +148,13 @@ class APIStack(Stack):
                                 "s3:GetObject",
                                 "s3:PutObject",
                                 "s3:DeleteObject",
+                                "s3:AbortMultipartUpload",
                             ],
                             resources=[
                                 webapphosting_stack.s3_demo_web_app_bucket.bucket_arn,
                                 webapphosting_stack.s3_demo_web_app_bucket.bucket_arn+'/*',
+                                storage_stack.s3_report_snapshots.bucket_arn,
+                                storage_stack.s3_report_snapshots.bucket_arn+'/*',
                             ]
                         )
                     ]
@@ -141,6 +172,23 @@ class APIStack(Stack):
                         )
                     ]
                 ),
+                "inline_policy_invoke_lambda": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            effect=iam.Effect.ALLOW,
+                            actions=[
+                                "lambda:InvokeFunction"
+                            ],
+                            resources=[
+                                # Large deletes and exports continue as an asynchronous invocation of the same function
+                                f"arn:aws:lambda:{self.region}:{self.account}:function:{self.stack_name}-delete-result",
+                                f"arn:aws:lambda:{self.region}:{self.account}:function:{self.stack_name}-delete-scenario",
+                                f"arn:aws:lambda:{self.region}:{self.account}:function:{self.stack_name}-export",
+                                f"arn:aws:lambda:{self.region}:{self.account}:function:{self.stack_name}-api-router"
+                            ]
+                        )
+                    ]
+                ),
                 "inline_policy_ecs": iam.PolicyDocument(
                     statements=[
                         iam.PolicyStatement(
@@ -195,14 +243,18 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/evaluate"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
+                "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
                 "ECS_CLUSTER": compute_stack.cluster.cluster_name,
                 "ECS_TASK_DEFINITION": compute_stack.taskdef_evaluator.family,
                 "ECS_SUBNET": [subnet.subnet_id for subnet in network_stack.vpc.select_subnets(subnet_type=ec2.SubnetType.PRIVATE_WITH_NAT).subnets][0],
                 "ECS_SECURITY_GROUP": network_stack.sg_ecs.security_group_id,
                 "ECS_CONTAINER_NAME": compute_stack.taskdef_evaluator.default_container.container_name,
+                "EVALUATION_QUEUE_URL": evaluation_queue_url,
                 "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
                 "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name,
                 "DDBTBL_SCENARIOS": storage_stack.ddbtbl_scenarios.table_name,
@@ -212,6 +264,8 @@ class APIStack(Stack):
             memory_size=1024          
         )        
         fn_evaluate.apply_removal_policy(RemovalPolicy.DESTROY)
+        if compute_stack.evaluation_queue:
+            compute_stack.evaluation_queue.grant_send_messages(role_lambda)
         
         # Create Lambda Functions - Results
         function_name=f"{self.stack_name}-results"
@@ -220,9 +274,12 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/results"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
+                "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
                 "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
                 "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name
             },
@@ -238,11 +295,14 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/new-scenario"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),  # Increased timeout for async processing
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
                 "DDBTBL_SCENARIOS": storage_stack.ddbtbl_scenarios.table_name,
-                "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name
+                "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name,
+                **compute_stack.rate_limit_environment
             },
             tracing=_lambda.Tracing.ACTIVE,  
             memory_size=1024          
@@ -256,9 +316,11 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/list-scenarios"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
                 "DDBTBL_SCENARIOS": storage_stack.ddbtbl_scenarios.table_name
             },
             tracing=_lambda.Tracing.ACTIVE,  
@@ -273,9 +335,11 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/delete-scenario"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
                 "DDBTBL_SCENARIOS": storage_stack.ddbtbl_scenarios.table_name,
                 "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name
             },
@@ -291,9 +355,11 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/get-scenario-questions"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
                 "DDBTBL_SCENARIOS": storage_stack.ddbtbl_scenarios.table_name,
                 "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name
             },
@@ -309,9 +375,11 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/delete-scenario-question"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
                 "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name
             },
             tracing=_lambda.Tracing.ACTIVE,  
@@ -326,9 +394,11 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/update-scenario-question"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
                 "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name
             },
             tracing=_lambda.Tracing.ACTIVE,  
@@ -343,9 +413,11 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/add-scenario-question"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
                 "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name
             },
             tracing=_lambda.Tracing.ACTIVE,  
@@ -360,9 +432,12 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/update-question-evaluation"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
+                "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
                 "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
                 "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name
             },
@@ -378,9 +453,13 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/save-evaluation-comment"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
+                "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
+                "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
                 "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name
             },
             tracing=_lambda.Tracing.ACTIVE,  
@@ -395,9 +474,12 @@ class APIStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_14,
             handler="index.lambda_handler",
             code=_lambda.Code.from_asset("./lambda-ecs/api/delete-result"),
+            layers=[layer_lambda],
             timeout=Duration.minutes(15),
             role=role_lambda,
             environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
+                "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
                 "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
                 "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name
             },
@@ -406,6 +488,128 @@ class APIStack(Stack):
         )        
         fn_delete_result.apply_removal_policy(RemovalPolicy.DESTROY)
         
+        # Create Lambda Functions - Score Rollups (DynamoDB stream consumer)
+        function_name=f"{self.stack_name}-score-rollups"
+        fn_score_rollups = _lambda.Function(self, function_name,
+            function_name=function_name,
+            runtime=_lambda.Runtime.PYTHON_3_14,
+            handler="index.lambda_handler",
+            code=_lambda.Code.from_asset("./lambda-ecs/stream/score-rollups"),
+            layers=[layer_lambda],
+            timeout=Duration.minutes(5),
+            role=role_lambda,
+            environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
+                "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
+                "DDBTBL_SCORE_ROLLUPS": storage_stack.ddbtbl_score_rollups.table_name
+            },
+            tracing=_lambda.Tracing.ACTIVE,  
+            memory_size=1024          
+        )        
+        fn_score_rollups.apply_removal_policy(RemovalPolicy.DESTROY)
+        
+        # Consume the streams of the tables holding reports and report questions
+        rollup_source_tables = [storage_stack.ddbtbl_data] if storage_stack.ddbtbl_data else [storage_stack.ddbtbl_evaluation_report, storage_stack.ddbtbl_evaluation_report_questions]
+        for table in rollup_source_tables:
+            fn_score_rollups.add_event_source(lambda_event_sources.DynamoEventSource(table,
+                starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+                batch_size=100,
+                retry_attempts=10,
+                report_batch_item_failures=True
+            ))
+        
+        # Create Lambda Functions - Analytics
+        function_name=f"{self.stack_name}-analytics"
+        fn_analytics = _lambda.Function(self, function_name,
+            function_name=function_name,
+            runtime=_lambda.Runtime.PYTHON_3_14,
+            handler="index.lambda_handler",
+            code=_lambda.Code.from_asset("./lambda-ecs/api/analytics"),
+            layers=[layer_lambda],
+            timeout=Duration.minutes(15),
+            role=role_lambda,
+            environment={
+                "DDBTBL_SCORE_ROLLUPS": storage_stack.ddbtbl_score_rollups.table_name
+            },
+            tracing=_lambda.Tracing.ACTIVE,  
+            memory_size=1024          
+        )        
+        fn_analytics.apply_removal_policy(RemovalPolicy.DESTROY)
+        
+        # Create Lambda Functions - Export
+        function_name=f"{self.stack_name}-export"
+        fn_export = _lambda.Function(self, function_name,
+            function_name=function_name,
+            runtime=_lambda.Runtime.PYTHON_3_14,
+            handler="index.lambda_handler",
+            code=_lambda.Code.from_asset("./lambda-ecs/api/export"),
+            layers=[layer_lambda, layer_export],
+            timeout=Duration.minutes(15),
+            role=role_lambda,
+            environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
+                "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
+                "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
+                "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name
+            },
+            tracing=_lambda.Tracing.ACTIVE,  
+            memory_size=1024          
+        )        
+        fn_export.apply_removal_policy(RemovalPolicy.DESTROY)
+        
+        # Create Lambda Functions - Compare
+        function_name=f"{self.stack_name}-compare"
+        fn_compare = _lambda.Function(self, function_name,
+            function_name=function_name,
+            runtime=_lambda.Runtime.PYTHON_3_14,
+            handler="index.lambda_handler",
+            code=_lambda.Code.from_asset("./lambda-ecs/api/compare"),
+            layers=[layer_lambda],
+            timeout=Duration.minutes(15),
+            role=role_lambda,
+            environment={
+                "DDBTBL_DATA": ddbtbl_data_name,
+                "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
+                "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
+                "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name
+            },
+            tracing=_lambda.Tracing.ACTIVE,  
+            memory_size=1024          
+        )        
+        fn_compare.apply_removal_policy(RemovalPolicy.DESTROY)
+        
+        # Create Lambda Functions - API Router (optional), dispatching to the handlers of the functions above
+        fn_api_router = None
+        if use_api_router:
+            function_name=f"{self.stack_name}-api-router"
+            fn_api_router = _lambda.Function(self, function_name,
+                function_name=function_name,
+                runtime=_lambda.Runtime.PYTHON_3_14,
+                handler="router/index.lambda_handler",
+                code=_lambda.Code.from_asset("./lambda-ecs/api", exclude=["fsi-sample-genai-app", "new-scenario", "**/__pycache__"]),
+                layers=[layer_lambda, layer_export],
+                timeout=Duration.minutes(15),
+                role=role_lambda,
+                environment={
+                    "DDBTBL_DATA": ddbtbl_data_name,
+                    "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
+                    "ECS_CLUSTER": compute_stack.cluster.cluster_name,
+                    "ECS_TASK_DEFINITION": compute_stack.taskdef_evaluator.family,
+                    "ECS_SUBNET": [subnet.subnet_id for subnet in network_stack.vpc.select_subnets(subnet_type=ec2.SubnetType.PRIVATE_WITH_NAT).subnets][0],
+                    "ECS_SECURITY_GROUP": network_stack.sg_ecs.security_group_id,
+                    "ECS_CONTAINER_NAME": compute_stack.taskdef_evaluator.default_container.container_name,
+                    "EVALUATION_QUEUE_URL": evaluation_queue_url,
+                    "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
+                    "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name,
+                    "DDBTBL_SCENARIOS": storage_stack.ddbtbl_scenarios.table_name,
+                    "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name,
+                    "DDBTBL_SCORE_ROLLUPS": storage_stack.ddbtbl_score_rollups.table_name
+                },
+                tracing=_lambda.Tracing.ACTIVE,  
+                memory_size=1024          
+            )        
+            fn_api_router.apply_removal_policy(RemovalPolicy.DESTROY)
+        
         # Create API Gateway CloudWatch Role Permission
         role_api_gateway_cloudwatch = iam.Role(self, 
             f"{self.stack_name}-api_gateway_cloudwatch",
@@ -451,6 +655,9 @@ class APIStack(Stack):
                 "allow_headers": ["*"],
                 "allow_credentials": True,
             },
+            # Compress responses of 1 KiB and more (gzip or deflate, as the client's Accept-Encoding allows),
+            # /results bodies shrink about 4-6x, see scripts/benchmark_compression.py
+            min_compression_size=Size.kibibytes(1),
             deploy_options=apigateway.StageOptions(
                 access_log_destination=apigateway.LogGroupLogDestination(
                     apigateway_log_group
@@ -500,12 +707,12 @@ class APIStack(Stack):
         
         # Create /evaluate resource with Lambda proxy integration
         evaluate_resource = api.root.add_resource('evaluate')
-        evaluate_resource.add_method('POST', apigateway.LambdaIntegration(fn_evaluate), api_key_required=True)
+        evaluate_resource.add_method('POST', apigateway.LambdaIntegration(fn_api_router or fn_evaluate), api_key_required=True)
         evaluate_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /results resource with Lambda proxy integration
         results_resource = api.root.add_resource('results')
-        results_resource.add_method('GET', apigateway.LambdaIntegration(fn_results), api_key_required=True)
+        results_resource.add_method('GET', apigateway.LambdaIntegration(fn_api_router or fn_results), api_key_required=True)
         results_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /new-scenario resource with Lambda async integration (non-proxy)
@@ -564,48 +771,64 @@ class APIStack(Stack):
         
         # Create /list-scenarios resource with Lambda proxy integration
         list_scenarios_resource = api.root.add_resource('list-scenarios')
-        list_scenarios_resource.add_method('GET', apigateway.LambdaIntegration(fn_list_scenarios), api_key_required=True)
+        list_scenarios_resource.add_method('GET', apigateway.LambdaIntegration(fn_api_router or fn_list_scenarios), api_key_required=True)
         list_scenarios_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /delete-scenario resource with Lambda proxy integration
         delete_scenario_resource = api.root.add_resource('delete-scenario')
-        delete_scenario_resource.add_method('GET', apigateway.LambdaIntegration(fn_delete_scenario), api_key_required=True)
+        delete_scenario_resource.add_method('GET', apigateway.LambdaIntegration(fn_api_router or fn_delete_scenario), api_key_required=True)
         delete_scenario_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /get-scenario-questions resource with Lambda proxy integration
         get_scenario_questions_resource = api.root.add_resource('get-scenario-questions')
-        get_scenario_questions_resource.add_method('GET', apigateway.LambdaIntegration(fn_get_scenario_questions), api_key_required=True)
+        get_scenario_questions_resource.add_method('GET', apigateway.LambdaIntegration(fn_api_router or fn_get_scenario_questions), api_key_required=True)
         get_scenario_questions_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /delete-scenario-question resource with Lambda proxy integration
         delete_scenario_question_resource = api.root.add_resource('delete-scenario-question')
-        delete_scenario_question_resource.add_method('GET', apigateway.LambdaIntegration(fn_delete_scenario_question), api_key_required=True)
+        delete_scenario_question_resource.add_method('GET', apigateway.LambdaIntegration(fn_api_router or fn_delete_scenario_question), api_key_required=True)
         delete_scenario_question_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /update-scenario-question resource with Lambda proxy integration
         update_scenario_question_resource = api.root.add_resource('update-scenario-question')
-        update_scenario_question_resource.add_method('POST', apigateway.LambdaIntegration(fn_update_scenario_question), api_key_required=True)
+        update_scenario_question_resource.add_method('POST', apigateway.LambdaIntegration(fn_api_router or fn_update_scenario_question), api_key_required=True)
         update_scenario_question_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /add-scenario-question resource with Lambda proxy integration
         add_scenario_question_resource = api.root.add_resource('add-scenario-question')
-        add_scenario_question_resource.add_method('POST', apigateway.LambdaIntegration(fn_add_scenario_question), api_key_required=True)
+        add_scenario_question_resource.add_method('POST', apigateway.LambdaIntegration(fn_api_router or fn_add_scenario_question), api_key_required=True)
         add_scenario_question_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /update-question-evaluation resource with Lambda proxy integration
         update_question_evaluation_resource = api.root.add_resource('update-question-evaluation')
-        update_question_evaluation_resource.add_method('POST', apigateway.LambdaIntegration(fn_update_question_evaluation), api_key_required=True)
+        update_question_evaluation_resource.add_method('POST', apigateway.LambdaIntegration(fn_api_router or fn_update_question_evaluation), api_key_required=True)
         update_question_evaluation_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /save-evaluation-comment resource with Lambda proxy integration
         save_evaluation_comment_resource = api.root.add_resource('save-evaluation-comment')
-        save_evaluation_comment_resource.add_method('POST', apigateway.LambdaIntegration(fn_save_evaluation_comment), api_key_required=True)
+        save_evaluation_comment_resource.add_method('POST', apigateway.LambdaIntegration(fn_api_router or fn_save_evaluation_comment), api_key_required=True)
         save_evaluation_comment_resource.apply_removal_policy(RemovalPolicy.DESTROY)
         
         # Create /delete-result resource with Lambda proxy integration
         delete_result_resource = api.root.add_resource('delete-result')
-        delete_result_resource.add_method('DELETE', apigateway.LambdaIntegration(fn_delete_result), api_key_required=True)
+        delete_result_resource.add_method('DELETE', apigateway.LambdaIntegration(fn_api_router or fn_delete_result), api_key_required=True)
         delete_result_resource.apply_removal_policy(RemovalPolicy.DESTROY)
+        
+        # Create /analytics resource with Lambda proxy integration
+        analytics_resource = api.root.add_resource('analytics')
+        analytics_resource.add_method('GET', apigateway.LambdaIntegration(fn_api_router or fn_analytics), api_key_required=True)
+        analytics_resource.apply_removal_policy(RemovalPolicy.DESTROY)
+
+        # Create /export resource with Lambda proxy integration (POST starts an export, GET polls it)
+        export_resource = api.root.add_resource('export')
+        export_resource.add_method('POST', apigateway.LambdaIntegration(fn_api_router or fn_export), api_key_required=True)
+        export_resource.add_method('GET', apigateway.LambdaIntegration(fn_api_router or fn_export), api_key_required=True)
+        export_resource.apply_removal_policy(RemovalPolicy.DESTROY)
+
+        # Create /compare resource with Lambda proxy integration
+        compare_resource = api.root.add_resource('compare')
+        compare_resource.add_method('GET', apigateway.LambdaIntegration(fn_api_router or fn_compare), api_key_required=True)
+        compare_resource.apply_removal_policy(RemovalPolicy.DESTROY)
 
         # Create API key and usage plan
         api_key = api.add_api_key(f"{self.stack_name}-apiKey", api_key_name=f"{self.stack_name}-apiKey")
@@ -1,18 +1,33 @@
 from aws_cdk import (
     Stack,
+    Duration,
     RemovalPolicy,
+    CfnOutput,
     aws_iam as iam,
     Stack,
     aws_logs as logs,
     aws_ecs as ecs,
     aws_ecr_assets as ecr_assets,
+    aws_ec2 as ec2,
+    aws_sqs as sqs,
+    aws_cloudwatch as cloudwatch,
+    aws_applicationautoscaling as appscaling,
 )
 from constructs import Construct
 import time
 
+WORKER_MAX_TASKS = 4
+
 class ComputeStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, storage_stack, network_stack, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
+
+        # Bedrock requests per minute per model shared by all evaluations and scenario generation
+        # (cdk.json context "bedrock_rate_limit_rpm", 0 disables the limiter)
+        rate_limit_environment = {
+            "DDBTBL_RATE_LIMITS": storage_stack.ddbtbl_rate_limits.table_name,
+            "BEDROCK_RATE_LIMIT_RPM": str(self.node.try_get_context("bedrock_rate_limit_rpm") or 0)
+        }
         
         # Create Fargate Definition
         taskdef_evaluator = ecs.FargateTaskDefinition(self, 
@@ -32,9 +47,11 @@ class ComputeStack(Stack):
         # Add container to the task definition
         container = taskdef_evaluator.add_container("Container",
             image=ecs.ContainerImage.from_asset(
-                "./lambda-ecs/evaluator",
+                "./lambda-ecs",  # Build context includes the shared data access module
+                file="evaluator/Dockerfile",
                 platform=ecr_assets.Platform.LINUX_AMD64
             ),
+            environment=rate_limit_environment,
             logging=ecs.LogDriver.aws_logs(stream_prefix=self.stack_name, log_group=evaluator_log_group),
         )
         container.add_to_execution_policy(
@@ -51,7 +68,8 @@ class ComputeStack(Stack):
                 resources=[f"arn:aws:logs:*:{self.account}:log-group:*:log-stream:*"]
             )
         )
-        taskdef_evaluator.add_to_task_role_policy(
+        # Permissions of the evaluator, as a task started per evaluation and as the optional worker service
+        evaluator_statements = [
             iam.PolicyStatement(
                 effect=iam.Effect.ALLOW,
                 actions=[
@@ -64,22 +82,40 @@ class ComputeStack(Stack):
                 resources=[
                     storage_stack.ddbtbl_evaluation_report.table_arn,
                     storage_stack.ddbtbl_evaluation_report_questions.table_arn,
-                    storage_stack.ddbtbl_scenario_questions.table_arn
+                    f"{storage_stack.ddbtbl_evaluation_report_questions.table_arn}/index/*",
+                    storage_stack.ddbtbl_scenario_questions.table_arn,
+                    f"{storage_stack.ddbtbl_scenario_questions.table_arn}/index/*",
+                    storage_stack.ddbtbl_rate_limits.table_arn,
+                    *([storage_stack.ddbtbl_data.table_arn, f"{storage_stack.ddbtbl_data.table_arn}/index/*"] if storage_stack.ddbtbl_data else [])
                 ]
-            )
-        )
-        taskdef_evaluator.add_to_task_role_policy(
+            ),
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=["s3:PutObject"],
+                resources=[f"{storage_stack.s3_report_snapshots.bucket_arn}/*"]
+            ),
             iam.PolicyStatement(
                 effect=iam.Effect.ALLOW,
                 actions=["bedrock:InvokeModel", "bedrock:InvokeModelWithResponseStream"],
+                # The evaluator calls the inference profiles from every region of BEDROCK_REGIONS
                 resources=[
                     f"arn:aws:bedrock:us-east-1::foundation-model/anthropic.claude-3-7-sonnet-20250219-v1:0", 
                     f"arn:aws:bedrock:us-east-2::foundation-model/anthropic.claude-3-7-sonnet-20250219-v1:0", 
                     f"arn:aws:bedrock:us-west-2::foundation-model/anthropic.claude-3-7-sonnet-20250219-v1:0", 
-                    f"arn:aws:bedrock:{self.region}:{self.account}:inference-profile/us.anthropic.claude-3-7-sonnet-20250219-v1:0",                    
+                    f"arn:aws:bedrock:us-east-1:{self.account}:inference-profile/us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+                    f"arn:aws:bedrock:us-east-2:{self.account}:inference-profile/us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+                    f"arn:aws:bedrock:us-west-2:{self.account}:inference-profile/us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+                    f"arn:aws:bedrock:us-east-1::foundation-model/anthropic.claude-3-5-haiku-20241022-v1:0", 
+                    f"arn:aws:bedrock:us-east-2::foundation-model/anthropic.claude-3-5-haiku-20241022-v1:0", 
+                    f"arn:aws:bedrock:us-west-2::foundation-model/anthropic.claude-3-5-haiku-20241022-v1:0", 
+                    f"arn:aws:bedrock:us-east-1:{self.account}:inference-profile/us.anthropic.claude-3-5-haiku-20241022-v1:0",
+                    f"arn:aws:bedrock:us-east-2:{self.account}:inference-profile/us.anthropic.claude-3-5-haiku-20241022-v1:0",
+                    f"arn:aws:bedrock:us-west-2:{self.account}:inference-profile/us.anthropic.claude-3-5-haiku-20241022-v1:0",
                 ]
             )
-        )
+        ]
+        for statement in evaluator_statements:
+            taskdef_evaluator.add_to_task_role_policy(statement)
 
         # Create ECS Cluster
         cluster = ecs.Cluster(self, f"{self.stack_name}-ecs-cluster", 
@@ -89,5 +125,117 @@ class ComputeStack(Stack):
         )
         self.cluster = cluster
         cluster.apply_removal_policy(RemovalPolicy.DESTROY)
-        
-        
+
+        # Create optional evaluator worker service (cdk.json context "evaluator_worker"): long-running tasks take
+        # evaluation jobs from an SQS queue, /evaluate falls back to starting a task per evaluation without it
+        self.rate_limit_environment = rate_limit_environment
+
+        self.evaluation_queue = None
+        if str(self.node.try_get_context("evaluator_worker")).lower() == "true":
+            min_tasks_context = self.node.try_get_context("evaluator_worker_min_tasks")
+            worker_min_tasks = 1 if min_tasks_context is None else int(min_tasks_context)
+            evaluation_dlq = sqs.Queue(self, f"{self.stack_name}-evaluation-jobs-dlq",
+                retention_period=Duration.days(14),
+                enforce_ssl=True,
+                removal_policy=RemovalPolicy.DESTROY
+            )
+            evaluation_queue = sqs.Queue(self, f"{self.stack_name}-evaluation-jobs",
+                visibility_timeout=Duration.minutes(15),  # Extended by the worker while an evaluation runs
+                enforce_ssl=True,
+                dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=3, queue=evaluation_dlq),
+                removal_policy=RemovalPolicy.DESTROY
+            )
+            self.evaluation_queue = evaluation_queue
+            CfnOutput(self, "SQS queue for evaluation jobs", value=evaluation_queue.queue_url)
+
+            taskdef_worker = ecs.FargateTaskDefinition(self, 
+                f"{self.stack_name}-evaluator-worker-taskdef",
+                cpu=4096,  
+                memory_limit_mib=8192
+            )
+            taskdef_worker.apply_removal_policy(RemovalPolicy.DESTROY)
+            worker_container = taskdef_worker.add_container("Container",
+                image=ecs.ContainerImage.from_asset(
+                    "./lambda-ecs",
+                    file="evaluator/Dockerfile",
+                    platform=ecr_assets.Platform.LINUX_AMD64
+                ),
+                command=["python3", "worker.py"],
+                environment={
+                    "EVALUATION_QUEUE_URL": evaluation_queue.queue_url,
+                    "WORKER_CONCURRENCY": "4",
+                    "DDBTBL_DATA": storage_stack.ddbtbl_data.table_name if storage_stack.ddbtbl_data else "",
+                    "DDBTBL_EVALUATION_REPORT": storage_stack.ddbtbl_evaluation_report.table_name,
+                    "DDBTBL_EVALUATION_REPORT_QUESTIONS": storage_stack.ddbtbl_evaluation_report_questions.table_name,
+                    "DDBTBL_SCENARIO_QUESTIONS": storage_stack.ddbtbl_scenario_questions.table_name,
+                    "S3_REPORT_SNAPSHOTS": storage_stack.s3_report_snapshots.bucket_name,
+                    **rate_limit_environment
+                },
+                stop_timeout=Duration.minutes(2),
+                logging=ecs.LogDriver.aws_logs(stream_prefix=f"{self.stack_name}-worker", log_group=evaluator_log_group),
+            )
+            worker_container.add_to_execution_policy(
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["logs:CreateLogStream", "logs:PutLogEvents"],
+                    resources=[f"arn:aws:logs:*:{self.account}:log-group:*:log-stream:*"]
+                )
+            )
+            for statement in evaluator_statements:
+                taskdef_worker.add_to_task_role_policy(statement)
+            # Questions left by an interrupted evaluation are deleted before the job runs again
+            taskdef_worker.add_to_task_role_policy(
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=["dynamodb:BatchWriteItem", "dynamodb:DeleteItem"],
+                    resources=[
+                        storage_stack.ddbtbl_evaluation_report_questions.table_arn,
+                        *([storage_stack.ddbtbl_data.table_arn] if storage_stack.ddbtbl_data else [])
+                    ]
+                )
+            )
+            evaluation_queue.grant_consume_messages(taskdef_worker.task_role)
+
+            service_worker = ecs.FargateService(self, f"{self.stack_name}-evaluator-worker",
+                cluster=cluster,
+                task_definition=taskdef_worker,
+                desired_count=worker_min_tasks,
+                vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_NAT),
+                security_groups=[network_stack.sg_ecs],
+                min_healthy_percent=100
+            )
+            service_worker.apply_removal_policy(RemovalPolicy.DESTROY)
+
+            # Add a task while jobs wait for a free slot, two when 10 or more wait. A worker receives only as many
+            # jobs as it has free slots, so visible messages mean every running task is full; running jobs alone
+            # never add tasks. Remove tasks only when no job is waiting or running
+            # ("evaluator_worker_min_tasks": 0 scales to zero when idle, at the cost of a task start for the next job)
+            waiting = evaluation_queue.metric_approximate_number_of_messages_visible(period=Duration.minutes(1))
+            backlog = cloudwatch.MathExpression(
+                expression="visible + running",
+                using_metrics={
+                    "visible": waiting,
+                    "running": evaluation_queue.metric_approximate_number_of_messages_not_visible(period=Duration.minutes(1))
+                },
+                period=Duration.minutes(1)
+            )
+            scaling = service_worker.auto_scale_task_count(min_capacity=worker_min_tasks, max_capacity=WORKER_MAX_TASKS)
+            scaling.scale_on_metric(f"{self.stack_name}-evaluator-worker-waiting",
+                metric=waiting,
+                scaling_steps=[
+                    appscaling.ScalingInterval(upper=1, change=0),
+                    appscaling.ScalingInterval(lower=1, change=+1),
+                    appscaling.ScalingInterval(lower=10, change=+2)
+                ],
+                adjustment_type=appscaling.AdjustmentType.CHANGE_IN_CAPACITY,
+                cooldown=Duration.minutes(5)
+            )
+            scaling.scale_on_metric(f"{self.stack_name}-evaluator-worker-idle",
+                metric=backlog,
+                scaling_steps=[
+                    appscaling.ScalingInterval(upper=0, change=-1),
+                    appscaling.ScalingInterval(lower=1, change=0)
+                ],
+                adjustment_type=appscaling.AdjustmentType.CHANGE_IN_CAPACITY,
+                cooldown=Duration.minutes(5)
+            )
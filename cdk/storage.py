@@ -1,4 +1,4 @@
-from aws_cdk import Stack, aws_dynamodb as dynamodb, RemovalPolicy, CfnOutput
+from aws_cdk import Stack, aws_dynamodb as dynamodb, aws_s3 as s3, RemovalPolicy, CfnOutput, Duration
 from constructs import Construct
 
 class StorageStack(Stack):
@@ -15,12 +15,13 @@ class StorageStack(Stack):
                 point_in_time_recovery_enabled=True
             ),
             time_to_live_attribute="ttl_timestamp",
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,  # Consumed by the score rollups
             removal_policy=RemovalPolicy.DESTROY
         )
         self.ddbtbl_evaluation_report = ddbtbl_evaluation_report
         CfnOutput(self, "DynamoDB table for evaluation report", value=ddbtbl_evaluation_report.table_name)
 
-        # Create DynamoDB table for evaluation report
+        # Create DynamoDB table for evaluation report questions
         table_name = f"{self.stack_name}-evaluation-report-questions"
         ddbtbl_evaluation_report_questions = dynamodb.Table(self, id=table_name,
             table_name=table_name,
@@ -31,8 +32,15 @@ class StorageStack(Stack):
                 point_in_time_recovery_enabled=True
             ),
             time_to_live_attribute="ttl_timestamp",
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,  # Consumed by the score rollups
             removal_policy=RemovalPolicy.DESTROY
         )
+        # Questions of a report are read and deleted with a paginated Query on the parent key
+        ddbtbl_evaluation_report_questions.add_global_secondary_index(
+            index_name="report-index",
+            partition_key=dynamodb.Attribute(name="report_id", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="question_id", type=dynamodb.AttributeType.STRING)
+        )
         self.ddbtbl_evaluation_report_questions = ddbtbl_evaluation_report_questions
         CfnOutput(self, "DynamoDB table for evaluation report questions", value=ddbtbl_evaluation_report_questions.table_name)
 
@@ -48,6 +56,12 @@ class StorageStack(Stack):
             time_to_live_attribute="ttl_timestamp",
             removal_policy=RemovalPolicy.DESTROY
         )
+        # Scenarios are listed newest first, a page at a time
+        ddbtbl_scenarios.add_global_secondary_index(
+            index_name="created-index",
+            partition_key=dynamodb.Attribute(name="entity_type", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="created_epoch", type=dynamodb.AttributeType.NUMBER)
+        )
         self.ddbtbl_scenarios = ddbtbl_scenarios
         CfnOutput(self, "DynamoDB table for scenarios", value=ddbtbl_scenarios.table_name)
 
@@ -64,6 +78,90 @@ class StorageStack(Stack):
             time_to_live_attribute="ttl_timestamp",
             removal_policy=RemovalPolicy.DESTROY
         )
+        # Questions of a scenario are read and deleted with a paginated Query on the parent key
+        ddbtbl_scenario_questions.add_global_secondary_index(
+            index_name="scenario-index",
+            partition_key=dynamodb.Attribute(name="scenario_id", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="question_id", type=dynamodb.AttributeType.STRING)
+        )
         self.ddbtbl_scenario_questions = ddbtbl_scenario_questions
         CfnOutput(self, "DynamoDB table for scenario questions", value=ddbtbl_scenario_questions.table_name)
 
+        # Create DynamoDB table for score rollups per scenario, endpoint, pillar and day
+        table_name = f"{self.stack_name}-score-rollups"
+        ddbtbl_score_rollups = dynamodb.Table(self, id=table_name,
+            table_name=table_name,
+            partition_key=dynamodb.Attribute(name="rollup_id", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="bucket", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            point_in_time_recovery_specification=dynamodb.PointInTimeRecoverySpecification(
+                point_in_time_recovery_enabled=True
+            ),
+            time_to_live_attribute="ttl_timestamp",
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        self.ddbtbl_score_rollups = ddbtbl_score_rollups
+        CfnOutput(self, "DynamoDB table for score rollups", value=ddbtbl_score_rollups.table_name)
+
+        # Create DynamoDB table for the Bedrock request token buckets shared by evaluations and scenario generation
+        table_name = f"{self.stack_name}-rate-limits"
+        ddbtbl_rate_limits = dynamodb.Table(self, id=table_name,
+            table_name=table_name,
+            partition_key=dynamodb.Attribute(name="limiter_id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            point_in_time_recovery_specification=dynamodb.PointInTimeRecoverySpecification(
+                point_in_time_recovery_enabled=True
+            ),
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        self.ddbtbl_rate_limits = ddbtbl_rate_limits
+        CfnOutput(self, "DynamoDB table for rate limits", value=ddbtbl_rate_limits.table_name)
+
+        # Create S3 bucket for the gzip JSON snapshots of completed reports (read by /results) and for report exports
+        # (CSV / Parquet), which the browser downloads through presigned URLs
+        s3_report_snapshots = s3.Bucket(self, f"{self.stack_name}-report-snapshots",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True,
+            enforce_ssl=True,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            lifecycle_rules=[s3.LifecycleRule(
+                prefix="exports/",
+                expiration=Duration.days(7),
+                abort_incomplete_multipart_upload_after=Duration.days(1)
+            )],
+            cors=[s3.CorsRule(
+                allowed_methods=[s3.HttpMethods.GET, s3.HttpMethods.HEAD],
+                allowed_origins=["*"],
+                allowed_headers=["*"],
+                max_age=3000
+            )]
+        )
+        self.s3_report_snapshots = s3_report_snapshots
+        CfnOutput(self, "S3 bucket for report snapshots", value=s3_report_snapshots.bucket_name)
+
+        # Create optional single DynamoDB table holding reports, scenarios and their questions
+        # (enable with the cdk.json context "single_table": true, then run scripts/backfill_single_table.py)
+        self.ddbtbl_data = None
+        if str(self.node.try_get_context("single_table")).lower() == "true":
+            table_name = f"{self.stack_name}-data"
+            ddbtbl_data = dynamodb.Table(self, id=table_name,
+                table_name=table_name,
+                partition_key=dynamodb.Attribute(name="pk", type=dynamodb.AttributeType.STRING),
+                sort_key=dynamodb.Attribute(name="sk", type=dynamodb.AttributeType.STRING),
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                point_in_time_recovery_specification=dynamodb.PointInTimeRecoverySpecification(
+                    point_in_time_recovery_enabled=True
+                ),
+                time_to_live_attribute="ttl_timestamp",
+                stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,  # Consumed by the score rollups
+                removal_policy=RemovalPolicy.DESTROY
+            )
+            # Reports and scenarios are listed newest first by entity type without scanning their questions
+            ddbtbl_data.add_global_secondary_index(
+                index_name="entity-index",
+                partition_key=dynamodb.Attribute(name="entity_type", type=dynamodb.AttributeType.STRING),
+                sort_key=dynamodb.Attribute(name="created_epoch", type=dynamodb.AttributeType.NUMBER)
+            )
+            self.ddbtbl_data = ddbtbl_data
+            CfnOutput(self, "DynamoDB single table", value=ddbtbl_data.table_name)
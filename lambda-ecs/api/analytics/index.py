@@ -0,0 +1,81 @@
+import os
+import boto3
+import serialization
+from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Key
+
+dynamodb = boto3.resource('dynamodb')
+ddbtbl_score_rollups_name = os.environ.get("DDBTBL_SCORE_ROLLUPS", "")
+ddbtbl_score_rollups = dynamodb.Table(ddbtbl_score_rollups_name)
+
+# Rollups maintained by the score-rollups stream consumer
+DIMENSIONS = ["all", "scenario", "endpoint", "pillar", "scenario-pillar"]
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+
+def returnMessage(data, status_code=200):
+    cors_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Methods': 'OPTIONS,GET,POST,PUT,DELETE'
+    }
+    return {
+        'statusCode': status_code,
+        'headers': cors_headers,
+        'body': serialization.dumps(data)
+    }
+
+def format_rollup(item):
+    """Counters of a rollup item with the average score and the 1-5 histogram"""
+    question_count = int(item.get('question_count', 0))
+    score_sum = item.get('score_sum', 0)
+    return {
+        'report_count': item.get('report_count', 0),
+        'question_count': question_count,
+        'evaluated_count': item.get('evaluated_count', 0),
+        'average_score': float(score_sum) / question_count if question_count else None,
+        'histogram': {str(score): item.get(f"hist_{score}", 0) for score in range(1, 6)}
+    }
+
+def lambda_handler(event, context):
+    try:
+        query_params = event.get('queryStringParameters', {}) or {}
+        dimension = query_params.get('dimension', 'all')
+        value = query_params.get('value', 'all' if dimension == 'all' else '')
+
+        if dimension not in DIMENSIONS:
+            return returnMessage({"message": f"dimension must be one of {', '.join(DIMENSIONS)}"}, 400)
+        if not value:
+            return returnMessage({"message": "value is required as a query parameter"}, 400)
+
+        # Day range, defaults to the last DEFAULT_DAYS days
+        try:
+            to_day = datetime.strptime(query_params['to'], "%Y-%m-%d") if query_params.get('to') else datetime.utcnow()
+            from_day = datetime.strptime(query_params['from'], "%Y-%m-%d") if query_params.get('from') else to_day - timedelta(days=DEFAULT_DAYS - 1)
+        except ValueError:
+            return returnMessage({"message": "from and to must be dates in YYYY-MM-DD format"}, 400)
+        if from_day > to_day or (to_day - from_day).days >= MAX_DAYS:
+            return returnMessage({"message": f"from must not be after to, and the range is limited to {MAX_DAYS} days"}, 400)
+
+        rollup_id = f"{dimension}#{value}"
+
+        # One Query for the daily rollups and one read for the totals, whatever the number of reports
+        response = ddbtbl_score_rollups.query(
+            KeyConditionExpression=Key('rollup_id').eq(rollup_id) & Key('bucket').between(from_day.strftime("%Y-%m-%d"), to_day.strftime("%Y-%m-%d"))
+        )
+        days = response.get('Items', [])
+        total = ddbtbl_score_rollups.get_item(Key={'rollup_id': rollup_id, 'bucket': 'ALL'}).get('Item', {})
+
+        return returnMessage({
+            'message': 'Analytics retrieved successfully',
+            'dimension': dimension,
+            'value': value,
+            'from': from_day.strftime("%Y-%m-%d"),
+            'to': to_day.strftime("%Y-%m-%d"),
+            'total': format_rollup(total),
+            'days': [{'day': item['bucket'], **format_rollup(item)} for item in days]
+        })
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return returnMessage({"message": f"Error retrieving analytics: {str(e)}"}, 500)
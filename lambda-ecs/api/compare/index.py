@@ -0,0 +1,171 @@
+import cache
+import data_access
+import serialization
+import text_similarity
+
+# Answers or considerations whose term-vector cosine similarity is below this are flagged as changed
+CHANGED_TEXT_THRESHOLD = 0.9
+
+# Serialized comparisons per report pair and version marker, so repeated regression reviews skip the loading and the join
+compare_cache = cache.TTLCache("compare", max_entries=16, ttl_seconds=300)
+
+def returnMessage(msg, status_code=200, etag=None):
+    cors_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
+        'Access-Control-Allow-Methods': 'OPTIONS,GET,POST,PUT,DELETE'
+    }
+    if etag:
+        # Clients revalidate with If-None-Match on every load instead of caching blindly
+        cors_headers.update({'ETag': etag, 'Cache-Control': 'no-cache', 'Access-Control-Expose-Headers': 'ETag'})
+    if status_code == 304:
+        return {'statusCode': 304, 'headers': cors_headers, 'body': ''}
+    return {
+        'statusCode': status_code,
+        'headers': cors_headers,
+        'body': serialization.dumps({
+            'message': msg
+        })
+    }
+
+def get_header(event, name):
+    """Request header value, header names are case-insensitive"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+def load_questions(report_id):
+    """Questions of a completed report with their category, from its snapshot when it has one"""
+    snapshot = data_access.get_report_snapshot(report_id)
+    if snapshot:
+        return [{**pair, 'category': category} for category, pairs in snapshot['promptPairs'].items() for pair in pairs]
+    return data_access.get_report_questions(report_id)
+
+def index_questions(questions):
+    """Questions keyed by the hash of their normalized category and text.
+    A question asked several times in a category is keyed by its occurrence, so repeats pair up in order"""
+    indexed = {}
+    occurrences = {}
+    for question in questions:
+        key = text_similarity.text_hash(question.get('category', ''), question.get('question', ''))
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        indexed[f"{key}-{occurrence}" if occurrence else key] = question
+    return indexed
+
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def delta(base_value, target_value):
+    base_value, target_value = to_number(base_value), to_number(target_value)
+    if base_value is None or target_value is None:
+        return None
+    return round(target_value - base_value, 2)
+
+def compare_text(base_text, target_text):
+    """(similarity, changed) of two answers or considerations"""
+    if text_similarity.normalize_text(base_text) == text_similarity.normalize_text(target_text):
+        return 1.0, False
+    similarity = text_similarity.cosine_similarity(text_similarity.term_vector(base_text), text_similarity.term_vector(target_text))
+    return round(similarity, 3), similarity < CHANGED_TEXT_THRESHOLD
+
+def compare_reports(base_report, target_report):
+    """Join the questions of two reports by question hash and return per-question and per-pillar differences"""
+    base_questions = index_questions(load_questions(base_report['id']))
+    target_questions = index_questions(load_questions(target_report['id']))
+
+    questions = []
+    pillars = {}
+    for key, base in base_questions.items():
+        target = target_questions.get(key)
+        if target is None:
+            continue
+        category = base.get('category', '')
+        answer_similarity, answer_changed = compare_text(base.get('answer', ''), target.get('answer', ''))
+        considerations_similarity, considerations_changed = compare_text(base.get('considerations', ''), target.get('considerations', ''))
+        score_delta = delta(base.get('score'), target.get('score'))
+        questions.append({
+            'key': key,
+            'category': category,
+            'question': target.get('question', ''),
+            'base_question_id': base.get('question_id'),
+            'target_question_id': target.get('question_id'),
+            'base_score': base.get('score'),
+            'target_score': target.get('score'),
+            'score_delta': score_delta,
+            'answer_changed': answer_changed,
+            'answer_similarity': answer_similarity,
+            'considerations_changed': considerations_changed,
+            'considerations_similarity': considerations_similarity
+        })
+        pillar = pillars.setdefault(category, {'questions': 0, 'scores_changed': 0, 'answers_changed': 0})
+        pillar['questions'] += 1
+        pillar['scores_changed'] += 1 if score_delta else 0
+        pillar['answers_changed'] += 1 if answer_changed else 0
+
+    base_breakdown = base_report.get('score_breakdown') or {}
+    target_breakdown = target_report.get('score_breakdown') or {}
+    for category in set(base_breakdown) | set(target_breakdown) | set(pillars):
+        pillar = pillars.setdefault(category, {'questions': 0, 'scores_changed': 0, 'answers_changed': 0})
+        pillar.update({
+            'base_score': base_breakdown.get(category),
+            'target_score': target_breakdown.get(category),
+            'score_delta': delta(base_breakdown.get(category), target_breakdown.get(category))
+        })
+
+    # Largest score changes first, then changed answers
+    questions.sort(key=lambda q: (-abs(q['score_delta'] or 0), not q['answer_changed'], q['category']))
+    return {
+        'base': {'id': base_report['id'], 'name': base_report.get('name', ''), 'datetime': base_report.get('datetime', ''), 'score': base_report.get('score')},
+        'target': {'id': target_report['id'], 'name': target_report.get('name', ''), 'datetime': target_report.get('datetime', ''), 'score': target_report.get('score')},
+        'score_delta': delta(base_report.get('score'), target_report.get('score')),
+        'summary': {
+            'matched': len(questions),
+            'only_in_base': len(base_questions.keys() - target_questions.keys()),
+            'only_in_target': len(target_questions.keys() - base_questions.keys()),
+            'scores_changed': sum(1 for q in questions if q['score_delta']),
+            'answers_changed': sum(1 for q in questions if q['answer_changed']),
+            'considerations_changed': sum(1 for q in questions if q['considerations_changed'])
+        },
+        'pillars': pillars,
+        'questions': questions
+    }
+
+def lambda_handler(event, context):
+    try:
+        query_params = event.get('queryStringParameters', {}) or {}
+        base_id = query_params.get('base')
+        target_id = query_params.get('target')
+        if not base_id or not target_id:
+            return returnMessage("base and target report ids are required as query parameters", 400)
+
+        # Comparisons change whenever one of the reports does, i.e. with the reports version marker
+        etag = f'"compare-{data_access.get_version("reports")}"'
+        if get_header(event, 'If-None-Match') == etag:
+            return returnMessage(None, 304, etag)
+        cached_response = compare_cache.get((base_id, target_id, etag))
+        if cached_response is not None:
+            cache.log_stats()
+            return cached_response
+
+        reports = {}
+        for report_id in (base_id, target_id):
+            report = data_access.get_report(report_id)
+            if not report or report.get('status') == 'DELETING':
+                return returnMessage(f"Report {report_id} not found", 404)
+            if not report.get('score'):
+                return returnMessage(f"Evaluation of report {report_id} is still running", 409)
+            reports[report_id] = report
+
+        response = returnMessage(compare_reports(reports[base_id], reports[target_id]), etag=etag)
+        compare_cache.put((base_id, target_id, etag), response)
+        cache.log_stats()
+        return response
+
+    except Exception as e:
+        print(f"Error comparing reports: {str(e)}")
+        return returnMessage(f"Error comparing reports: {str(e)}", 500)
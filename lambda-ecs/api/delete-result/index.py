@@ -1,21 +1,15 @@
 import json
 import os
 import boto3
-from boto3.dynamodb.conditions import Attr
-from decimal import Decimal
+import data_access
+import serialization
 from datetime import datetime
 
-def decimal_default(obj):
-    """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
+lambda_client = data_access.LazyClient(lambda: boto3.client('lambda'))  # Only used for large deletes
 
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_evaluation_report_name = os.environ.get("DDBTBL_EVALUATION_REPORT", "")
-ddbtbl_evaluation_report_questions_name = os.environ.get("DDBTBL_EVALUATION_REPORT_QUESTIONS", "")
-ddbtbl_evaluation_report = dynamodb.Table(ddbtbl_evaluation_report_name)
-ddbtbl_evaluation_report_questions = dynamodb.Table(ddbtbl_evaluation_report_questions_name)
+# Reports with more questions than this are marked DELETING and deleted by an asynchronous invocation,
+# so the API response time does not grow with the size of the report
+DELETE_SYNC_THRESHOLD = 500
 
 def returnMessage(statusCode, msg):
     cors_headers = {
@@ -26,12 +20,29 @@ def returnMessage(statusCode, msg):
     return {
         'statusCode': statusCode,
         'headers': cors_headers,
-        'body': json.dumps({
+        'body': serialization.dumps({
             'message': msg
-        }, default=decimal_default)         
+        })         
     }
 
+def cascade_delete(report_id):
+    """Delete the questions of a report, then the report itself"""
+    deleted_questions_count = data_access.delete_report_questions(report_id)
+    print(f"Deleted {deleted_questions_count} questions for report {report_id}")
+    
+    # The report goes last so a failed delete can be retried while it is still listed
+    data_access.delete_report_snapshot(report_id)
+    data_access.delete_report(report_id)
+    print(f"Deleted report {report_id}")
+    return deleted_questions_count
+
 def lambda_handler(event, context):
+    # Background cascade started by a previous invocation of this function
+    if 'cascade_delete' in event:
+        report_id = event['cascade_delete']['report_id']
+        cascade_delete(report_id)
+        return {'message': f'Deleted report {report_id}'}
+    
     try:
         # Parse the request body
         body = json.loads(event['body'])
@@ -40,36 +51,25 @@ def lambda_handler(event, context):
         if not report_id:
             return returnMessage(400, 'report_id is required')
         
-        # Delete from evaluation-report table
-        try:
-            ddbtbl_evaluation_report.delete_item(
-                Key={'id': report_id}
+        # Hand large reports over to an asynchronous invocation
+        if data_access.count_report_questions(report_id, DELETE_SYNC_THRESHOLD) > DELETE_SYNC_THRESHOLD:
+            data_access.update_report(
+                report_id,
+                UpdateExpression='SET #status = :status',
+                ConditionExpression='attribute_exists(id)',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':status': 'DELETING'}
             )
-            print(f"Deleted report {report_id} from evaluation-report table")
-        except Exception as e:
-            print(f"Error deleting from evaluation-report table: {str(e)}")
-            # Continue with questions deletion even if report deletion fails
+            lambda_client.invoke(
+                FunctionName=context.function_name,
+                InvocationType='Event',
+                Payload=json.dumps({'cascade_delete': {'report_id': report_id}})
+            )
+            print(f"Report {report_id} marked DELETING, deleting in the background")
+            return returnMessage(202, f'Deleting report {report_id} and all associated questions in the background')
         
-        # Delete all questions for this report from evaluation-report-questions table
         try:
-            # First, scan to find all questions for this report
-            response = ddbtbl_evaluation_report_questions.scan(
-                FilterExpression=Attr('report_id').eq(report_id)
-            )
-            
-            questions_to_delete = response.get('Items', [])
-            
-            # Delete each question
-            for question in questions_to_delete:
-                ddbtbl_evaluation_report_questions.delete_item(
-                    Key={
-                        'question_id': question['question_id'],
-                        'report_id': question['report_id']
-                    }
-                )
-            
-            print(f"Deleted {len(questions_to_delete)} questions for report {report_id}")
-            
+            cascade_delete(report_id)
         except Exception as e:
             print(f"Error deleting questions: {str(e)}")
             return returnMessage(500, f'Error deleting questions: {str(e)}')
@@ -1,10 +1,6 @@
 import json
 import os
-import boto3
-
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_scenario_questions_name = os.environ.get("DDBTBL_SCENARIO_QUESTIONS", "")
-ddbtbl_scenario_questions = dynamodb.Table(ddbtbl_scenario_questions_name)
+import data_access
 
 def returnMessage(msg, status_code=200):
     cors_headers = {
@@ -31,12 +27,7 @@ def lambda_handler(event, context):
             return returnMessage("scenario_id and question_id are required as query parameters", 400)
         
         # Delete the question
-        ddbtbl_scenario_questions.delete_item(
-            Key={
-                'question_id': question_id,
-                'scenario_id': scenario_id
-            }
-        )
+        data_access.delete_scenario_question(scenario_id, question_id)
         
         return returnMessage(f"Question {question_id} deleted successfully")
         
@@ -1,13 +1,13 @@
 import json
 import os
 import boto3
-from boto3.dynamodb.conditions import Key
+import data_access
 
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_scenarios_name = os.environ.get("DDBTBL_SCENARIOS", "")
-ddbtbl_scenario_questions_name = os.environ.get("DDBTBL_SCENARIO_QUESTIONS", "")
-ddbtbl_scenarios = dynamodb.Table(ddbtbl_scenarios_name)
-ddbtbl_scenario_questions = dynamodb.Table(ddbtbl_scenario_questions_name)
+lambda_client = data_access.LazyClient(lambda: boto3.client('lambda'))  # Only used for large deletes
+
+# Scenarios with more questions than this are marked DELETING and deleted by an asynchronous invocation,
+# so the API response time does not grow with the size of the scenario
+DELETE_SYNC_THRESHOLD = 500
 
 def returnMessage(msg, status_code=200):
     cors_headers = {
@@ -23,7 +23,23 @@ def returnMessage(msg, status_code=200):
         })         
     }
 
+def cascade_delete(scenario_id):
+    """Delete the questions of a scenario, then the scenario itself"""
+    deleted_questions_count = data_access.delete_scenario_questions(scenario_id)
+    print(f"Deleted {deleted_questions_count} questions for scenario {scenario_id}")
+    
+    # The scenario goes last so a failed delete can be retried while it is still listed
+    data_access.delete_scenario(scenario_id)
+    print(f"Deleted scenario {scenario_id}")
+    return deleted_questions_count
+
 def lambda_handler(event, context):
+    # Background cascade started by a previous invocation of this function
+    if 'cascade_delete' in event:
+        scenario_id = event['cascade_delete']['scenario_id']
+        cascade_delete(scenario_id)
+        return {'message': f"Deleted scenario {scenario_id}"}
+    
     try:
         # Extract scenario_id from query parameters
         scenario_id = None
@@ -33,28 +49,25 @@ def lambda_handler(event, context):
         if not scenario_id:
             return returnMessage("scenario_id is required as a query parameter", 400)
         
-        # Delete all questions associated with this scenario
-        # Scan the table to find all questions with matching scenario_id
-        questions_response = ddbtbl_scenario_questions.scan(
-            FilterExpression=Key('scenario_id').eq(scenario_id)
-        )
-        
-        # Delete each question
-        deleted_questions_count = 0
-        if 'Items' in questions_response:
-            for question in questions_response['Items']:
-                ddbtbl_scenario_questions.delete_item(
-                    Key={
-                        'question_id': question['question_id'],
-                        'scenario_id': question['scenario_id']
-                    }
-                )
-                deleted_questions_count += 1
+        # Hand large scenarios over to an asynchronous invocation
+        if data_access.count_scenario_questions(scenario_id, DELETE_SYNC_THRESHOLD) > DELETE_SYNC_THRESHOLD:
+            data_access.update_scenario(
+                scenario_id,
+                UpdateExpression='SET #status = :status',
+                ConditionExpression='attribute_exists(scenario_id)',
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues={':status': 'DELETING'}
+            )
+            lambda_client.invoke(
+                FunctionName=context.function_name,
+                InvocationType='Event',
+                Payload=json.dumps({'cascade_delete': {'scenario_id': scenario_id}})
+            )
+            print(f"Scenario {scenario_id} marked DELETING, deleting in the background")
+            return returnMessage(f"Scenario {scenario_id} is being deleted in the background.", 202)
         
-        # Delete the scenario from scenarios table
-        ddbtbl_scenarios.delete_item(
-            Key={'scenario_id': scenario_id}
-        )
+        # Delete all questions associated with this scenario, then the scenario itself
+        deleted_questions_count = cascade_delete(scenario_id)
         
         return returnMessage(f"Scenario {scenario_id} deleted successfully. Removed {deleted_questions_count} associated questions.")
         
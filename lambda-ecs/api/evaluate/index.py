@@ -1,24 +1,30 @@
 import json
 import os
 import boto3
+import cache
+import data_access
 from decimal import Decimal
 from datetime import datetime
 
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_evaluation_report_name = os.environ.get("DDBTBL_EVALUATION_REPORT", "")
-ddbtbl_evaluation_report_questions_name = os.environ.get("DDBTBL_EVALUATION_REPORT_QUESTIONS", "")
-ddbtbl_scenarios_name = os.environ.get("DDBTBL_SCENARIOS", "")
-ddbtbl_scenario_questions_name = os.environ.get("DDBTBL_SCENARIO_QUESTIONS", "")
-ddbtbl_evaluation_report = dynamodb.Table(ddbtbl_evaluation_report_name)
-ddbtbl_scenarios = dynamodb.Table(ddbtbl_scenarios_name)
-ddbtbl_scenario_questions = dynamodb.Table(ddbtbl_scenario_questions_name)
-
-ecs_client = boto3.client('ecs')
+ecs_client = data_access.LazyClient(lambda: boto3.client('ecs'))  # Not used when the evaluation is queued for the worker service
 ecs_cluster = os.environ.get("ECS_CLUSTER","")
 ecs_task_definition = os.environ.get("ECS_TASK_DEFINITION","")
 ecs_subnet = os.environ.get("ECS_SUBNET","")
 ecs_security_group = os.environ.get("ECS_SECURITY_GROUP","")
 ecs_container_name = os.environ.get("ECS_CONTAINER_NAME","")
+evaluation_queue_url = os.environ.get("EVALUATION_QUEUE_URL","")
+sqs_client = data_access.LazyClient(lambda: boto3.client('sqs'))  # Only used with the evaluator worker service
+
+# Scenarios with more questions than this get a task of their own even when the worker service is deployed,
+# so they do not hold the concurrent job slots of a worker for a long time
+WORKER_MAX_QUESTIONS = 400
+PILLAR_COUNT = 8
+
+# Models the evaluator may use as judge or fast judge (see JUDGE_DEFAULTS of the evaluator)
+JUDGE_MODELS = {
+    "us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+    "us.anthropic.claude-3-5-haiku-20241022-v1:0",
+}
 
 # Define parameters for the ECS task
 params = {
@@ -35,58 +41,47 @@ params = {
     'count': 1
 }
 
-def get_next_id(table):
-    # Increment the counter atomically
-    response = table.update_item(
-        Key={'id': 'counter'},  # Dedicated key for the counter
-        UpdateExpression='ADD current_value :increment',
-        ExpressionAttributeValues={':increment': Decimal(1)},
-        ReturnValues='UPDATED_NEW'
-    )
-    # Return the new counter value
-    return response['Attributes']['current_value']
-
-def create_item_with_auto_increment(table, data):
+def create_report_with_generated_id(data):
     current_datetime = datetime.now()
     formatted_datetime = current_datetime.strftime("%d-%b-%Y %I:%M:%S %p")  # e.g., "18-Feb-2025 11:56:00 PM"
 
-    # Get the next auto-incremented ID
-    new_id = str(get_next_id(table))
+    # Generate a new, time-sortable ID
+    new_id = data_access.generate_id()
     
     # Add your data with the new ID
-    table.put_item(
-        Item={
-            'id': new_id,
-            'datetime': formatted_datetime,
-            **data  # Merge additional attributes into the item
-        }
-    )
+    data_access.put_report({
+        'id': new_id,
+        'datetime': formatted_datetime,
+        **data  # Merge additional attributes into the item
+    })
     print(f"Item created with ID: {new_id}")
     return new_id
 
-def update_item_with_key(table, key, data):
-    # Construct the UpdateExpression and ExpressionAttributeValues dynamically
-    update_expression = "SET " + ", ".join(f"#{k} = :{k}" for k in data.keys())
-    expression_attribute_names = {f"#{k}": k for k in data.keys()}
-    expression_attribute_values = {f":{k}": v for k, v in data.items()}
-
-    # Perform the update
-    response = table.update_item(
-        Key=key,
-        UpdateExpression=update_expression,
-        ExpressionAttributeNames=expression_attribute_names,
-        ExpressionAttributeValues=expression_attribute_values,
-        ReturnValues="UPDATED_NEW"
-    )
+def validate_judge(judge):
+    """Error message for an invalid judge override, None when it is valid"""
+    if not isinstance(judge, dict):
+        return 'judge must be an object'
+    unknown = set(judge) - {"cascade", "min_confidence", "model", "fast_model"}
+    if unknown:
+        return f'Unknown judge settings: {", ".join(sorted(unknown))}'
+    if not isinstance(judge.get("cascade", False), bool):
+        return 'judge.cascade must be true or false'
+    min_confidence = judge.get("min_confidence", 0)
+    if isinstance(min_confidence, bool) or not isinstance(min_confidence, (int, Decimal)) or not 0 <= min_confidence <= 100:
+        return 'judge.min_confidence must be a number from 0 to 100'
+    for key in ("model", "fast_model"):
+        if key in judge and judge[key] not in JUDGE_MODELS:
+            return f'judge.{key} must be one of: {", ".join(sorted(JUDGE_MODELS))}'
+    return None
 
-def returnMessage(msg):
+def returnMessage(msg, status_code=200):
     cors_headers = {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
         'Access-Control-Allow-Methods': 'OPTIONS,GET,POST,PUT,DELETE'
     }
     return {
-        'statusCode': 200,
+        'statusCode': status_code,
         'headers': cors_headers,
         'body': json.dumps({
             'message': msg
@@ -106,15 +101,24 @@ def lambda_handler(event, context):
         outputResponseKey = body.get("outputResponseKey","")
         copiedReportID = body.get("copiedReportID", "")
         scenario_id = body.get("scenario_id", "")
+        # Optional pre-judge overrides for the evaluator, e.g. {"enabled": false} or {"refusal_similarity": 0.6}
+        # ("rules" must be a list of rule names)
+        prejudge = json.loads(json.dumps(body.get("prejudge", {})), parse_float=Decimal)
+        if not isinstance(prejudge, dict) or not isinstance(prejudge.get("rules", []), list) or not all(isinstance(rule, str) for rule in prejudge.get("rules", [])):
+            return returnMessage('prejudge must be an object whose rules are a list of rule names', 400)
+        # Optional judge cascade overrides, e.g. {"cascade": true} or {"cascade": true, "min_confidence": 90}
+        judge = json.loads(json.dumps(body.get("judge", {})), parse_float=Decimal)
+        judge_error = validate_judge(judge)
+        if judge_error:
+            return returnMessage(judge_error, 400)
         
         # Check scenario existence for re-evaluations
         if copiedReportID and scenario_id:
             print(f"Re-evaluation requested for scenario: {scenario_id}")
             try:
-                scenario_check_response = ddbtbl_scenarios.get_item(
-                    Key={'scenario_id': scenario_id}
-                )
-                if 'Item' not in scenario_check_response:
+                # Read through to DynamoDB so a scenario deleted in another container is not missed
+                scenario_check = data_access.get_scenario(scenario_id, refresh=True)
+                if scenario_check is None or scenario_check.get('status') == 'DELETING':
                     print(f"Scenario {scenario_id} not found, blocking re-evaluation")
                     cors_headers = {
                         'Access-Control-Allow-Origin': '*',
@@ -154,18 +158,16 @@ def lambda_handler(event, context):
         
         if scenario_id:
             try:
-                scenario_response = ddbtbl_scenarios.get_item(
-                    Key={'scenario_id': scenario_id}
-                )
-                if 'Item' in scenario_response:
-                    scenario_item = scenario_response['Item']
+                # Served from the cache when the existence check above just read it
+                scenario_item = data_access.get_scenario(scenario_id)
+                if scenario_item:
                     scenario_name = scenario_item.get('scenario_name', '')
                     scenario_description = scenario_item.get('scenario_description', '')
                     questions_per_category = scenario_item.get('questions_per_category', 0)
             except Exception as e:
                 print(f"Error retrieving scenario details: {str(e)}")
                             
-        report_id = create_item_with_auto_increment(ddbtbl_evaluation_report, 
+        report_id = create_report_with_generated_id(
             { 
                 "name": name, 
                 "description": description,
@@ -178,10 +180,22 @@ def lambda_handler(event, context):
                 "scenario_id": scenario_id,
                 "scenario_name": scenario_name,
                 "scenario_description": scenario_description,
-                "questions_per_category": questions_per_category
+                "questions_per_category": questions_per_category,
+                "prejudge": prejudge,
+                "judge": judge
             }
         )
         
+        # Small evaluations go to the long-running worker service when it is deployed, the rest start a task
+        if evaluation_queue_url and int(questions_per_category or 0) * PILLAR_COUNT <= WORKER_MAX_QUESTIONS:
+            try:
+                sqs_client.send_message(QueueUrl=evaluation_queue_url, MessageBody=json.dumps({'report_id': report_id}))
+                print(f"Queued evaluation of report {report_id} for the worker service")
+                cache.log_stats()
+                return returnMessage("Evaluation started")
+            except Exception as e:
+                print(f"Error queueing evaluation of report {report_id}, starting a task instead: {str(e)}")
+        
         response = ecs_client.run_task(**params,
             overrides={
                 'containerOverrides': [
@@ -189,14 +203,17 @@ def lambda_handler(event, context):
                         'name': ecs_container_name,
                         'environment' : [
                             { 'name': 'report_id', 'value': report_id },
-                            { 'name': 'DDBTBL_EVALUATION_REPORT', 'value': ddbtbl_evaluation_report_name },
-                            { 'name': 'DDBTBL_EVALUATION_REPORT_QUESTIONS', 'value': ddbtbl_evaluation_report_questions_name },
-                            { 'name': 'DDBTBL_SCENARIO_QUESTIONS', 'value': ddbtbl_scenario_questions_name }
+                            { 'name': 'DDBTBL_DATA', 'value': data_access.ddbtbl_data_name },
+                            { 'name': 'DDBTBL_EVALUATION_REPORT', 'value': data_access.ddbtbl_evaluation_report_name },
+                            { 'name': 'DDBTBL_EVALUATION_REPORT_QUESTIONS', 'value': data_access.ddbtbl_evaluation_report_questions_name },
+                            { 'name': 'DDBTBL_SCENARIO_QUESTIONS', 'value': data_access.ddbtbl_scenario_questions_name },
+                            { 'name': 'S3_REPORT_SNAPSHOTS', 'value': data_access.s3_report_snapshots_name }
                         ]
                     }
                 ]
             }    
         )
+        cache.log_stats()
         return returnMessage("Evaluation started")
     else:
         return returnMessage("No body found in the event")
\ No newline at end of file
@@ -0,0 +1,208 @@
+import io
+import csv
+import json
+import boto3
+import data_access
+import serialization
+from datetime import datetime, timezone
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Provided by the export layer (layers-export/requirements.txt)
+    pyarrow = None
+
+lambda_client = data_access.LazyClient(lambda: boto3.client('lambda'))  # Only used for large exports
+
+# Exports of reports with more question rows than this continue in an asynchronous invocation and are
+# polled with GET /export?export_id=<id>, smaller ones are returned by the request that started them
+EXPORT_SYNC_THRESHOLD = 5000
+
+# Rows are streamed from DynamoDB to S3: one Query page, one batch of rows and one multipart part are held in memory
+CSV_FLUSH_ROWS = 1000
+PARQUET_ROW_GROUP_ROWS = 10000
+
+# One row per question, with the attributes of its report
+REPORT_COLUMNS = ['report_id', 'report_name', 'report_datetime', 'report_score', 'scenario_id', 'endpoint']
+QUESTION_COLUMNS = ['category', 'question_id', 'question', 'answer', 'considerations', 'human_evaluation', 'score', 'comments', 'prejudge_tag', 'judge_model']
+COLUMNS = REPORT_COLUMNS + QUESTION_COLUMNS
+INTEGER_COLUMNS = ('score',)
+
+FORMATS = {
+    # format -> (file extension, content type)
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet')
+}
+
+def returnMessage(statusCode, msg):
+    cors_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Methods': 'OPTIONS,GET,POST,PUT,DELETE'
+    }
+    return {
+        'statusCode': statusCode,
+        'headers': cors_headers,
+        'body': serialization.dumps({
+            'message': msg
+        })
+    }
+
+def select_reports(request):
+    """Completed reports matching the filters of an export request: report_id, report_ids, scenario_id, from and to (YYYY-MM-DD)"""
+    report_ids = request.get('report_ids') or ([request['report_id']] if request.get('report_id') else [])
+    if report_ids:
+        reports = [data_access.get_report(report_id) for report_id in report_ids]
+    else:
+        reports = data_access.list_reports()
+    reports = [r for r in reports if r and r.get('score') and r.get('status') != 'DELETING']
+
+    if request.get('scenario_id'):
+        reports = [r for r in reports if r.get('scenario_id') == request['scenario_id']]
+    if request.get('from') or request.get('to'):
+        low = data_access.created_epoch(f"{request.get('from') or '1970-01-01'} 00:00:00")
+        high = data_access.created_epoch(f"{request.get('to') or '9999-12-31'} 23:59:59")
+        reports = [r for r in reports if low <= int(r.get('created_epoch') or data_access.created_epoch(r.get('datetime'))) <= high]
+    return reports
+
+def export_rows(reports):
+    """Generator of the export rows, reading the questions of one report page by page"""
+    for report in reports:
+        report_columns = {
+            'report_id': report.get('id'),
+            'report_name': report.get('name', ''),
+            'report_datetime': report.get('datetime', ''),
+            'report_score': str(report.get('score', '')),
+            'scenario_id': report.get('scenario_id', ''),
+            'endpoint': report.get('endpoint', '')
+        }
+        for question in data_access.iter_report_questions(report.get('id')):
+            row = {column: question.get(column, '') for column in QUESTION_COLUMNS}
+            row['score'] = int(question['score']) if question.get('score') is not None else None
+            row.update(report_columns)
+            yield row
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_csv(rows, upload):
+    """Write the rows as UTF-8 CSV with a header row"""
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for batch in batches(rows, CSV_FLUSH_ROWS):
+        writer.writerows(batch)
+        count += len(batch)
+        upload.write(text.getvalue().encode('utf-8'))
+        text.seek(0)
+        text.truncate()
+    upload.write(text.getvalue().encode('utf-8'))  # Header only when there are no rows
+    return count
+
+def write_parquet(rows, upload):
+    """Write the rows as Parquet, one zstd-compressed row group per PARQUET_ROW_GROUP_ROWS rows"""
+    schema = pyarrow.schema([(column, pyarrow.int64() if column in INTEGER_COLUMNS else pyarrow.string()) for column in COLUMNS])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(upload, schema, compression='zstd') as writer:
+        for batch in batches(rows, PARQUET_ROW_GROUP_ROWS):
+            writer.write_batch(pyarrow.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+def run_export(export_id, export_format, report_ids):
+    """Stream the questions of the reports to the export file and record the outcome in the export status"""
+    extension, content_type = FORMATS[export_format]
+    reports = [r for r in (data_access.get_report(report_id) for report_id in report_ids) if r]
+    upload = data_access.open_report_export(export_id, extension, content_type)
+    started = datetime.now(timezone.utc)
+    try:
+        write = write_parquet if export_format == 'parquet' else write_csv
+        row_count = write(export_rows(reports), upload)
+        upload.close()
+    except Exception as e:
+        print(f"Error exporting {export_id}: {str(e)}")
+        upload.abort()
+        data_access.put_report_export_status(export_id, {'export_id': export_id, 'status': 'FAILED', 'error': str(e)})
+        raise
+    status = {
+        'export_id': export_id,
+        'status': 'COMPLETE',
+        'format': export_format,
+        'reports': len(reports),
+        'rows': row_count,
+        'bytes': upload.tell(),
+        'completed_at': datetime.now(timezone.utc).isoformat()
+    }
+    data_access.put_report_export_status(export_id, status)
+    print(f"Exported {row_count} rows of {len(reports)} reports to {export_id}.{extension} ({upload.tell()} bytes) in {(datetime.now(timezone.utc) - started).total_seconds():.1f}s")
+    return status
+
+def with_url(status):
+    """Export status with a presigned download URL once the export is complete"""
+    if status.get('status') == 'COMPLETE':
+        status = {**status, 'url': data_access.report_export_url(status['export_id'], FORMATS[status['format']][0]), 'expires_in': data_access.REPORT_EXPORT_URL_EXPIRY}
+    return status
+
+def lambda_handler(event, context):
+    # Background export started by a previous invocation of this function
+    if 'export_job' in event:
+        job = event['export_job']
+        run_export(job['export_id'], job['format'], job['report_ids'])
+        return {'message': f"Exported {job['export_id']}"}
+
+    try:
+        # Poll an export
+        if event.get('httpMethod') == 'GET':
+            export_id = (event.get('queryStringParameters') or {}).get('export_id')
+            if not export_id:
+                return returnMessage(400, 'export_id is required as a query parameter')
+            status = data_access.get_report_export_status(export_id)
+            if not status:
+                return returnMessage(404, f'Export {export_id} not found')
+            return returnMessage(200, with_url(status))
+
+        # Start an export
+        request = json.loads(event.get('body') or '{}')
+        export_format = request.get('format', 'csv')
+        if export_format not in FORMATS:
+            return returnMessage(400, f"format must be one of {', '.join(FORMATS)}")
+        if export_format == 'parquet' and not pyarrow:
+            return returnMessage(400, 'Parquet exports are not available, the export layer is missing pyarrow')
+
+        reports = select_reports(request)
+        if not reports:
+            return returnMessage(404, 'No completed reports match the request')
+        report_ids = [r['id'] for r in reports]
+        export_id = data_access.generate_id()
+
+        # Count the rows until the threshold is exceeded
+        row_count = 0
+        for report_id in report_ids:
+            row_count += data_access.count_report_questions(report_id, EXPORT_SYNC_THRESHOLD - row_count)
+            if row_count > EXPORT_SYNC_THRESHOLD:
+                break
+
+        # Hand large exports over to an asynchronous invocation
+        if row_count > EXPORT_SYNC_THRESHOLD:
+            data_access.put_report_export_status(export_id, {'export_id': export_id, 'status': 'RUNNING', 'format': export_format, 'reports': len(report_ids)})
+            lambda_client.invoke(
+                FunctionName=context.function_name,
+                InvocationType='Event',
+                Payload=json.dumps({'export_job': {'export_id': export_id, 'format': export_format, 'report_ids': report_ids}})
+            )
+            print(f"Exporting {len(report_ids)} reports to {export_id} in the background")
+            return returnMessage(202, {'export_id': export_id, 'status': 'RUNNING', 'format': export_format, 'reports': len(report_ids)})
+
+        return returnMessage(200, with_url(run_export(export_id, export_format, report_ids)))
+
+    except Exception as e:
+        print(f"Error exporting reports: {str(e)}")
+        return returnMessage(500, f'Error exporting reports: {str(e)}')
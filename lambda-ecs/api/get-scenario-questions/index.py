@@ -1,20 +1,7 @@
-import json
 import os
-import boto3
-from decimal import Decimal
-from boto3.dynamodb.conditions import Key
-
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_scenarios_name = os.environ.get("DDBTBL_SCENARIOS", "")
-ddbtbl_scenario_questions_name = os.environ.get("DDBTBL_SCENARIO_QUESTIONS", "")
-ddbtbl_scenarios = dynamodb.Table(ddbtbl_scenarios_name)
-ddbtbl_scenario_questions = dynamodb.Table(ddbtbl_scenario_questions_name)
-
-def decimal_default(obj):
-    """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
+import cache
+import data_access
+import serialization
 
 def returnMessage(data, status_code=200):
     cors_headers = {
@@ -25,7 +12,7 @@ def returnMessage(data, status_code=200):
     return {
         'statusCode': status_code,
         'headers': cors_headers,
-        'body': json.dumps(data, default=decimal_default)
+        'body': serialization.dumps(data)
     }
 
 def lambda_handler(event, context):
@@ -39,18 +26,11 @@ def lambda_handler(event, context):
             return returnMessage({"message": "scenario_id is required as a query parameter"}, 400)
         
         # Get scenario details
-        scenario_response = ddbtbl_scenarios.get_item(
-            Key={'scenario_id': scenario_id}
-        )
-        
-        scenario = scenario_response.get('Item', {})
+        scenario = data_access.get_scenario(scenario_id) or {}
         
         # Get scenario questions
-        questions_response = ddbtbl_scenario_questions.scan(
-            FilterExpression=Key('scenario_id').eq(scenario_id)
-        )
-        
-        questions = questions_response.get('Items', [])
+        questions = data_access.get_scenario_questions(scenario_id)
+        cache.log_stats()
         
         return returnMessage({
             'message': 'Scenario details retrieved successfully',
@@ -1,50 +1,76 @@
 import json
 import os
-import boto3
-from decimal import Decimal
-from boto3.dynamodb.conditions import Attr
+import hashlib
+import cache
+import data_access
+import serialization
 
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_scenarios_name = os.environ.get("DDBTBL_SCENARIOS", "")
-ddbtbl_scenarios = dynamodb.Table(ddbtbl_scenarios_name)
+MAX_PAGE_SIZE = 100
 
-def decimal_default(obj):
-    """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
+# Serialized responses per ETag, so warm invocations skip the scenario Query until a scenario changes
+pages_cache = cache.TTLCache("list-scenarios", max_entries=32, ttl_seconds=300)
 
-def returnMessage(data, status_code=200):
+def returnMessage(data, status_code=200, etag=None):
     cors_headers = {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
         'Access-Control-Allow-Methods': 'OPTIONS,GET,POST,PUT,DELETE'
     }
+    if etag:
+        # Clients revalidate with If-None-Match on every load instead of caching blindly
+        cors_headers.update({'ETag': etag, 'Cache-Control': 'no-cache', 'Access-Control-Expose-Headers': 'ETag'})
+    if status_code == 304:
+        return {'statusCode': 304, 'headers': cors_headers, 'body': ''}
     return {
         'statusCode': status_code,
         'headers': cors_headers,
-        'body': json.dumps(data, default=decimal_default)
+        'body': serialization.dumps(data)
     }
 
+def get_header(event, name):
+    """Request header value, header names are case-insensitive"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
 def lambda_handler(event, context):
     try:
-        # Scan all scenarios from the table, excluding the counter row
-        response = ddbtbl_scenarios.scan(
-            FilterExpression=~Attr('scenario_id').eq('counter')  # Exclude counter row
-        )
-        scenarios = response['Items']
+        query_params = event.get('queryStringParameters', {}) or {}
+        limit = query_params.get('limit')
+        cursor = query_params.get('cursor')
+        
+        # Each page has its own ETag, derived from the scenarios version marker and the query parameters
+        params_hash = hashlib.sha1(json.dumps(query_params, sort_keys=True).encode()).hexdigest()[:12]
+        etag = f'"scenarios-{data_access.get_version("scenarios")}-{params_hash}"'
+        if get_header(event, 'If-None-Match') == etag:
+            return returnMessage(None, 304, etag)
+        cached_response = pages_cache.get(etag)
+        if cached_response is not None:
+            cache.log_stats()
+            return cached_response
         
-        # Handle pagination if there are more items
-        while 'LastEvaluatedKey' in response:
-            response = ddbtbl_scenarios.scan(
-                FilterExpression=~Attr('scenario_id').eq('counter'),  # Exclude counter row
-                ExclusiveStartKey=response['LastEvaluatedKey']
-            )
-            scenarios.extend(response['Items'])
+        # Scenarios come back newest first from the created index, a page at a time when limit is given
+        next_cursor = None
+        if limit:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if limit < 1 or limit > MAX_PAGE_SIZE:
+                return returnMessage({'message': f"limit must be an integer between 1 and {MAX_PAGE_SIZE}"}, 400)
+            try:
+                scenarios, next_cursor = data_access.list_scenarios_page(limit, cursor)
+            except (ValueError, TypeError):
+                return returnMessage({'message': "Invalid cursor"}, 400)
+        else:
+            scenarios = data_access.list_scenarios()
         
-        # Transform the data to match UI expectations
+        # Transform the data to match UI expectations, leaving out scenarios being deleted in the background
         formatted_scenarios = []
         for scenario in scenarios:
+            if scenario.get('status') == 'DELETING':
+                continue
             formatted_scenario = {
                 'id': scenario.get('scenario_id', ''),
                 'name': scenario.get('scenario_name', ''),
@@ -52,35 +78,20 @@ def lambda_handler(event, context):
                 'questionsPerCategory': scenario.get('questions_per_category', 0),
                 'created_datetime': scenario.get('created_datetime', ''),
                 'status': scenario.get('status', 'COMPLETED'),  # Default to COMPLETED for backward compatibility
+                'generated_count': scenario.get('generated_count', 0),
                 'error_message': scenario.get('error_message', '')
             }
             formatted_scenarios.append(formatted_scenario)
         
-        # Sort by creation date (newest first)
-        # Convert datetime string to datetime object for proper sorting
-        from datetime import datetime
-        
-        def parse_datetime(dt_str):
-            if not dt_str:
-                return datetime.min
-            
-            try:
-                # Try new ISO format first: "2024-09-28 14:30:45"
-                return datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-            except (ValueError, TypeError):
-                try:
-                    # Fallback to old format: "28-Sep-2024 02:30:45 PM"
-                    return datetime.strptime(dt_str, "%d-%b-%Y %I:%M:%S %p")
-                except (ValueError, TypeError):
-                    # Fallback for invalid dates
-                    return datetime.min
-        
-        formatted_scenarios.sort(key=lambda x: parse_datetime(x.get('created_datetime', '')), reverse=True)
-        
-        return returnMessage({
+        page = {
             'message': 'Scenarios retrieved successfully',
-            'scenarios': formatted_scenarios
-        })
+            'scenarios': formatted_scenarios,
+            'next_cursor': next_cursor
+        }
+        response = returnMessage(page, etag=etag)
+        pages_cache.put(etag, response)
+        cache.log_stats()
+        return response
         
     except Exception as e:
         print(f"Error: {str(e)}")
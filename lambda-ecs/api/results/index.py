@@ -1,92 +1,83 @@
-import json
 import os
-import boto3
-from decimal import Decimal
+import cache
+import data_access
+import serialization
 from datetime import datetime
-from boto3.dynamodb.conditions import Attr
+from concurrent.futures import ThreadPoolExecutor
 
-def decimal_default(obj):
-    """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
-
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_evaluation_report_name = os.environ.get("DDBTBL_EVALUATION_REPORT", "")
-ddbtbl_evaluation_report_questions_name = os.environ.get("DDBTBL_EVALUATION_REPORT_QUESTIONS", "")
-ddbtbl_evaluation_report = dynamodb.Table(ddbtbl_evaluation_report_name)
-ddbtbl_evaluation_report_questions = dynamodb.Table(ddbtbl_evaluation_report_questions_name) if ddbtbl_evaluation_report_questions_name else None
-
-def returnMessage(msg):
+def returnMessage(msg, etag=None, status_code=200):
     cors_headers = {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
         'Access-Control-Allow-Methods': 'OPTIONS,GET,POST,PUT,DELETE'
     }
+    if etag:
+        # Clients revalidate with If-None-Match on every load instead of caching blindly
+        cors_headers.update({'ETag': etag, 'Cache-Control': 'no-cache', 'Access-Control-Expose-Headers': 'ETag'})
+    if status_code == 304:
+        return {'statusCode': 304, 'headers': cors_headers, 'body': ''}
     return {
-        'statusCode': 200,
+        'statusCode': status_code,
         'headers': cors_headers,
-        'body': json.dumps({
+        'body': serialization.dumps({
             'message': msg
-        }, default=decimal_default)         
+        })         
     }
-    
-def get_all_items(table):
-    # Perform the initial scan
-    response = table.scan(
-        FilterExpression=~Attr('id').eq('counter')  # Exclude rows where id is 'counter'
-    )
-    data = response['Items']
 
-    # Paginate through results if 'LastEvaluatedKey' is present
-    while 'LastEvaluatedKey' in response:
-        response = table.scan(
-            FilterExpression=~Attr('id').eq('counter'),
-            ExclusiveStartKey=response['LastEvaluatedKey']
-        )
-        data.extend(response['Items'])
-        
-    return data
+def get_header(event, name):
+    """Request header value, header names are case-insensitive"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
 
-def get_questions_for_report(report_id):
-    """Retrieve questions for a specific report from evaluation_report_questions table"""
-    if not ddbtbl_evaluation_report_questions:
-        return {}
+# Serialized responses per version marker, so warm invocations skip DynamoDB, S3 and JSON encoding until a report changes
+reports_cache = cache.TTLCache("results", max_entries=2, ttl_seconds=300)
+
+# Snapshots of completed reports are read this many at a time
+SNAPSHOT_READ_CONCURRENCY = 8
     
+def get_questions_for_report(report, version):
+    """Retrieve questions for a specific report, grouped by category.
+    version is the reports version marker read before the report, checked when the snapshot is created"""
+    report_id = report.get('id')
     try:
-        response = ddbtbl_evaluation_report_questions.scan(
-            FilterExpression=Attr('report_id').eq(str(report_id)) & ~Attr('question_id').eq('counter')
-        )
-        questions = response.get('Items', [])
-        
-        # Group questions by category to match UI expectations
-        prompt_pairs = {}
-        for question in questions:
-            category = question.get('category', '')
-            if category not in prompt_pairs:
-                prompt_pairs[category] = []
-            
-            prompt_pairs[category].append({
-                'question_id': question.get('question_id'),
-                'question': question.get('question', ''),
-                'answer': question.get('answer', ''),
-                'considerations': question.get('considerations', ''),
-                'human_evaluation': question.get('human_evaluation', 'PENDING'),
-                'score': question.get('score'),  # Include score field (1-5 or null if pending)
-                'comments': question.get('comments', '')
-            })
-        
-        return prompt_pairs
+        # Completed reports load from their snapshot, reports without one are read from DynamoDB and snapshotted
+        snapshot = data_access.get_report_snapshot(report_id)
+        if snapshot:
+            return snapshot['promptPairs']
+        questions = data_access.get_report_questions(report_id)
+        try:
+            data_access.write_report_snapshot(report_id, report, questions, only_if_missing=True, read_version=version)
+        except Exception as e:
+            print(f"Snapshot of report {report_id} not written: {str(e)}")
+        return data_access.group_report_questions(questions)
     except Exception as e:
         print(f"Error retrieving questions for report {report_id}: {str(e)}")
         return {}
 
 def lambda_handler(event, context):
-    reports = get_all_items(ddbtbl_evaluation_report)
+    # The version marker is read before the reports so a write in between only causes an extra full response
+    version = data_access.get_version("reports")
+    etag = f'"reports-{version}"'
+    if get_header(event, 'If-None-Match') == etag:
+        return returnMessage(None, etag, 304)
+
+    cached_response = reports_cache.get(etag)
+    if cached_response is not None:
+        cache.log_stats()
+        return cached_response
+
+    # Leave out reports being deleted in the background
+    reports = [r for r in data_access.list_reports() if r.get('status') != 'DELETING']
     
-    # Add promptPairs to each report from evaluation_report_questions table
-    for report in reports:
-        if report.get('score'):  # Only add questions for completed evaluations
-            report['promptPairs'] = get_questions_for_report(report.get('id'))
+    # Add promptPairs to each completed report, from its snapshot or the questions table
+    completed = [r for r in reports if r.get('score')]
+    with ThreadPoolExecutor(max_workers=SNAPSHOT_READ_CONCURRENCY) as executor:
+        for report, prompt_pairs in zip(completed, executor.map(lambda r: get_questions_for_report(r, version), completed)):
+            report['promptPairs'] = prompt_pairs
 
-    return returnMessage(reports)
+    response = returnMessage(reports, etag)
+    reports_cache.put(etag, response)
+    cache.log_stats()
+    return response
\ No newline at end of file
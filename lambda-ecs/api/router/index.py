@@ -0,0 +1,70 @@
+import json
+import os
+import importlib.util
+
+# Optional single API function (cdk.json context "api_router": true) dispatching API Gateway proxy
+# requests to the handlers of the single-purpose functions, deployed with the whole lambda-ecs/api
+# directory as its code. Handlers are imported on their first request and stay loaded, so they share
+# one warm container, the data_access clients and the caches instead of cold starting one by one.
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (HTTP method, API Gateway resource) -> handler directory under lambda-ecs/api
+ROUTES = {
+    ('POST', '/evaluate'): 'evaluate',
+    ('GET', '/results'): 'results',
+    ('GET', '/list-scenarios'): 'list-scenarios',
+    ('GET', '/delete-scenario'): 'delete-scenario',
+    ('GET', '/get-scenario-questions'): 'get-scenario-questions',
+    ('GET', '/delete-scenario-question'): 'delete-scenario-question',
+    ('POST', '/update-scenario-question'): 'update-scenario-question',
+    ('POST', '/add-scenario-question'): 'add-scenario-question',
+    ('POST', '/update-question-evaluation'): 'update-question-evaluation',
+    ('POST', '/save-evaluation-comment'): 'save-evaluation-comment',
+    ('DELETE', '/delete-result'): 'delete-result',
+    ('GET', '/analytics'): 'analytics',
+    ('POST', '/export'): 'export',
+    ('GET', '/export'): 'export',
+    ('GET', '/compare'): 'compare',
+}
+
+handlers = {}
+
+def get_handler(name):
+    """lambda_handler of a handler directory, imported on first use"""
+    if name not in handlers:
+        spec = importlib.util.spec_from_file_location(f"handler_{name.replace('-', '_')}", os.path.join(API_DIR, name, "index.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        handlers[name] = module.lambda_handler
+        print(f"Loaded handler {name}")
+    return handlers[name]
+
+def returnMessage(msg, status_code):
+    cors_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Methods': 'OPTIONS,GET,POST,PUT,DELETE'
+    }
+    return {
+        'statusCode': status_code,
+        'headers': cors_headers,
+        'body': json.dumps({
+            'message': msg
+        })
+    }
+
+def lambda_handler(event, context):
+    # Background cascade deletes and exports invoke the function that started them, i.e. this one
+    if 'cascade_delete' in event:
+        name = 'delete-result' if 'report_id' in event['cascade_delete'] else 'delete-scenario'
+        return get_handler(name)(event, context)
+    if 'export_job' in event:
+        return get_handler('export')(event, context)
+
+    method = event.get('httpMethod', '')
+    resource = event.get('resource', '')
+    name = ROUTES.get((method, resource))
+    if not name:
+        return returnMessage(f"No route for {method} {resource}", 404)
+    return get_handler(name)(event, context)
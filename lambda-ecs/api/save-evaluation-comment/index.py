@@ -1,19 +1,9 @@
 import json
 import os
-import boto3
-from decimal import Decimal
+import data_access
+import serialization
 from datetime import datetime
 
-def decimal_default(obj):
-    """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
-
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_evaluation_report_questions_name = os.environ.get("DDBTBL_EVALUATION_REPORT_QUESTIONS", "")
-ddbtbl_evaluation_report_questions = dynamodb.Table(ddbtbl_evaluation_report_questions_name)
-
 def returnMessage(statusCode, msg):
     cors_headers = {
         'Access-Control-Allow-Origin': '*',
@@ -23,9 +13,9 @@ def returnMessage(statusCode, msg):
     return {
         'statusCode': statusCode,
         'headers': cors_headers,
-        'body': json.dumps({
+        'body': serialization.dumps({
             'message': msg
-        }, default=decimal_default)         
+        })         
     }
 
 def lambda_handler(event, context):
@@ -43,11 +33,10 @@ def lambda_handler(event, context):
             return returnMessage(400, 'report_id is required')
         
         # Update the question record with comments
-        response = ddbtbl_evaluation_report_questions.update_item(
-            Key={
-                'question_id': question_id,
-                'report_id': report_id
-            },
+        response = data_access.update_report_question(
+            report_id,
+            question_id,
+            bump=False,  # Bumped once by patch_report_snapshot
             UpdateExpression='SET comments = :comments, updated_at = :updated_at',
             ExpressionAttributeValues={
                 ':comments': comments,
@@ -56,6 +45,9 @@ def lambda_handler(event, context):
             ReturnValues='UPDATED_NEW'
         )
         
+        # Patch the report snapshot with the new comments
+        data_access.patch_report_snapshot(report_id, question_id, {'comments': comments})
+        
         return returnMessage(200, 'Comments saved successfully')
         
     except Exception as e:
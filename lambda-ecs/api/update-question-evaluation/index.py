@@ -1,20 +1,7 @@
 import json
 import os
-import boto3
-from decimal import Decimal
-from boto3.dynamodb.conditions import Attr
-
-def decimal_default(obj):
-    """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    raise TypeError
-
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_evaluation_report_name = os.environ.get("DDBTBL_EVALUATION_REPORT", "")
-ddbtbl_evaluation_report_questions_name = os.environ.get("DDBTBL_EVALUATION_REPORT_QUESTIONS", "")
-ddbtbl_evaluation_report = dynamodb.Table(ddbtbl_evaluation_report_name)
-ddbtbl_evaluation_report_questions = dynamodb.Table(ddbtbl_evaluation_report_questions_name)
+import data_access
+import serialization
 
 def returnMessage(msg, status_code=200):
     cors_headers = {
@@ -25,18 +12,15 @@ def returnMessage(msg, status_code=200):
     return {
         'statusCode': status_code,
         'headers': cors_headers,
-        'body': json.dumps({
+        'body': serialization.dumps({
             'message': msg
-        }, default=decimal_default)         
+        })         
     }
 
 def get_questions_for_report(report_id):
     """Retrieve all questions for a specific report"""
     try:
-        response = ddbtbl_evaluation_report_questions.scan(
-            FilterExpression=Attr('report_id').eq(str(report_id)) & ~Attr('question_id').eq('counter')
-        )
-        return response.get('Items', [])
+        return data_access.get_report_questions(report_id)
     except Exception as e:
         print(f"Error retrieving questions for report {report_id}: {str(e)}")
         return []
@@ -72,10 +56,11 @@ def recalculate_report_scores(report_id):
     # Overall score = average of all category scores
     overall_score = sum(category_scores) / len(category_scores) if category_scores else 1.0
     
-    # Update evaluation_report table
+    # Update the report scores
     try:
-        ddbtbl_evaluation_report.update_item(
-            Key={'id': str(report_id)},
+        data_access.update_report(
+            report_id,
+            bump=False,  # Bumped once by patch_report_snapshot
             UpdateExpression='SET score = :score, score_breakdown = :breakdown',
             ExpressionAttributeValues={
                 ':score': str(overall_score),
@@ -86,6 +71,8 @@ def recalculate_report_scores(report_id):
     except Exception as e:
         print(f"Error updating report scores: {str(e)}")
         raise e
+    
+    return {'score': str(overall_score), 'score_breakdown': score_breakdown}
 
 def lambda_handler(event, context):
     try:
@@ -111,8 +98,10 @@ def lambda_handler(event, context):
             return returnMessage("Invalid score value. Must be an integer between 1 and 5", 400)
         
         # Update the question evaluation with score and set status to EVALUATED
-        ddbtbl_evaluation_report_questions.update_item(
-            Key={'question_id': question_id, 'report_id': str(report_id)},
+        data_access.update_report_question(
+            report_id,
+            question_id,
+            bump=False,  # Bumped once by patch_report_snapshot
             UpdateExpression='SET human_evaluation = :eval, score = :score',
             ExpressionAttributeValues={
                 ':eval': 'EVALUATED',
@@ -121,7 +110,15 @@ def lambda_handler(event, context):
         )
         
         # Recalculate scores for the report
-        recalculate_report_scores(report_id)
+        report_scores = recalculate_report_scores(report_id)
+        
+        # Patch the report snapshot with the new question score and report scores
+        data_access.patch_report_snapshot(
+            report_id,
+            question_id,
+            {'human_evaluation': 'EVALUATED', 'score': score_value},
+            report_scores
+        )
         
         return returnMessage({
             "success": True,
@@ -1,10 +1,6 @@
 import json
 import os
-import boto3
-
-dynamodb = boto3.resource('dynamodb')
-ddbtbl_scenario_questions_name = os.environ.get("DDBTBL_SCENARIO_QUESTIONS", "")
-ddbtbl_scenario_questions = dynamodb.Table(ddbtbl_scenario_questions_name)
+import data_access
 
 def returnMessage(msg, status_code=200):
     cors_headers = {
@@ -37,11 +33,9 @@ def lambda_handler(event, context):
             return returnMessage("scenario_id, question_id, category, and question are required", 400)
         
         # Update the question
-        ddbtbl_scenario_questions.update_item(
-            Key={
-                'question_id': question_id,
-                'scenario_id': scenario_id
-            },
+        data_access.update_scenario_question(
+            scenario_id,
+            question_id,
             UpdateExpression='SET category = :category, question = :question',
             ExpressionAttributeValues={
                 ':category': category,
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import signal
+import threading
+import boto3
+import data_access
+from concurrent.futures import ThreadPoolExecutor
+from index import evaluate_report
+
+# Long-running evaluator (optional, cdk.json context "evaluator_worker"): an ECS service that takes evaluation
+# jobs ({"report_id": ...}) from the EVALUATION_QUEUE_URL SQS queue and runs up to WORKER_CONCURRENCY of them
+# at a time in this process, so evaluations start without waiting for a new Fargate task.
+# Each job keeps the thread pools of evaluate_report, so one large evaluation cannot take the threads of another.
+# A message is deleted once its evaluation finished, it is received again after a crash and moves to the
+# dead-letter queue after repeated failures.
+
+queue_url = os.environ.get("EVALUATION_QUEUE_URL", "")
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "4"))
+VISIBILITY_TIMEOUT = 900  # seconds, extended every HEARTBEAT_SECONDS while a job runs
+HEARTBEAT_SECONDS = 300
+
+sqs_client = data_access.LazyClient(lambda: boto3.client('sqs'))
+running = {}  # receipt handle -> report_id
+running_lock = threading.Lock()
+stopping = threading.Event()
+
+def prepare_job(report_id):
+    """False when the job must not run: the report is gone or was already evaluated.
+    Questions saved by an interrupted earlier attempt are deleted so the evaluation starts over"""
+    report = data_access.get_report(report_id)
+    if not report or report.get('status') == 'DELETING':
+        print(f"Skipping job of report {report_id}: report not found")
+        return False
+    if report.get('score'):
+        print(f"Skipping job of report {report_id}: already evaluated")
+        return False
+    if data_access.count_report_questions(report_id, 0):
+        deleted = data_access.delete_report_questions(report_id)
+        print(f"Deleted {deleted} questions of an interrupted evaluation of report {report_id}")
+    return True
+
+def job_report_id(message):
+    try:
+        return json.loads(message['Body']).get('report_id')
+    except (ValueError, AttributeError):
+        return None
+
+def run_job(message):
+    receipt_handle = message['ReceiptHandle']
+    report_id = job_report_id(message)
+    started = time.time()
+    try:
+        if not report_id:
+            print(f"Skipping job without report_id: {message['Body'][:200]}")
+        elif prepare_job(report_id):
+            evaluate_report(report_id)
+            print(f"Evaluated report {report_id} in {time.time() - started:.1f}s")
+        sqs_client.delete_message(QueueUrl=queue_url, ReceiptHandle=receipt_handle)
+    except Exception as e:
+        # Left on the queue, the job is received again once its visibility timeout expires
+        print(f"Error evaluating report {report_id}: {str(e)}")
+    finally:
+        with running_lock:
+            running.pop(receipt_handle, None)
+
+def heartbeat():
+    """Keep the messages of running jobs invisible to other workers"""
+    while not stopping.wait(HEARTBEAT_SECONDS):
+        with running_lock:
+            receipt_handles = list(running)
+        for receipt_handle in receipt_handles:
+            try:
+                sqs_client.change_message_visibility(QueueUrl=queue_url, ReceiptHandle=receipt_handle, VisibilityTimeout=VISIBILITY_TIMEOUT)
+            except Exception as e:
+                print(f"Error extending visibility of job {running.get(receipt_handle)}: {str(e)}")
+
+def stop(signum, frame):
+    # ECS sends SIGTERM before stopping the task: take no new jobs, unfinished ones are received again by another task
+    print("Stopping, no new jobs are taken")
+    stopping.set()
+
+def main():
+    signal.signal(signal.SIGTERM, stop)
+    threading.Thread(target=heartbeat, daemon=True).start()
+    print(f"Evaluator worker polling {queue_url} with {WORKER_CONCURRENCY} concurrent jobs")
+    with ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY) as executor:
+        while not stopping.is_set():
+            with running_lock:
+                free = WORKER_CONCURRENCY - len(running)
+            if free <= 0:
+                time.sleep(1)
+                continue
+            try:
+                response = sqs_client.receive_message(
+                    QueueUrl=queue_url,
+                    MaxNumberOfMessages=min(free, 10),
+                    WaitTimeSeconds=20,  # Long polling
+                    VisibilityTimeout=VISIBILITY_TIMEOUT
+                )
+            except Exception as e:
+                print(f"Error receiving jobs: {str(e)}")
+                time.sleep(5)
+                continue
+            for message in response.get('Messages', []):
+                with running_lock:
+                    running[message['ReceiptHandle']] = job_report_id(message)
+                executor.submit(run_job, message)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import threading
+import boto3
+import botocore.config
+
+# Bedrock runtime clients for several regions, so review calls spread over the quotas of every region the
+# IAM policies allow instead of throttling against the quota of AWS_REGION alone.
+#
+# Regions are picked by smooth weighted round-robin (BEDROCK_REGIONS, e.g. "us-east-1=2,us-east-2,us-west-2").
+# A region that throttles is left out for a cooldown that doubles with every consecutive throttle, up to
+# MAX_COOLDOWN_SECONDS; when every region is cooling down, callers wait for the first one to come back.
+# call() does not retry: callers bound their throttle retries and back off once no region is left (has_ready_region).
+# Per-region calls, throttles, errors and latency are published as CloudWatch embedded metrics by publish_stats().
+
+DEFAULT_REGIONS = "us-east-1,us-east-2,us-west-2"
+BASE_COOLDOWN_SECONDS = 2
+MAX_COOLDOWN_SECONDS = 60
+METRICS_NAMESPACE = "RAIEvaluator/Bedrock"
+
+def is_throttle(error):
+    text = str(error).upper()
+    return "THROTTLINGEXCEPTION" in text or "TOO MANY REQUESTS" in text or "SERVICEUNAVAILABLE" in text
+
+def parse_regions(text):
+    """{region: weight} of a comma-separated list of region or region=weight entries"""
+    regions = {}
+    for entry in text.split(","):
+        name, _, weight = entry.strip().partition("=")
+        if name:
+            regions[name] = max(int(weight or 1), 1)
+    return regions
+
+class RegionState:
+    def __init__(self, name, weight):
+        self.name = name
+        self.weight = weight
+        self.current_weight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_throttles = 0
+        self.client = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.calls = 0
+        self.throttles = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+class BedrockPool:
+    def __init__(self, regions=None, read_timeout=900, connect_timeout=900, max_pool_connections=50):
+        self.regions = [RegionState(name, weight) for name, weight in parse_regions(regions or os.environ.get("BEDROCK_REGIONS", DEFAULT_REGIONS)).items()]
+        self.config = botocore.config.Config(read_timeout=read_timeout, connect_timeout=connect_timeout, max_pool_connections=max_pool_connections)
+        self.lock = threading.Lock()
+
+    def get_client(self, region):
+        """bedrock-runtime client of a region, created on first use and shared by all threads"""
+        with self.lock:
+            if region.client is None:
+                region.client = boto3.client(service_name='bedrock-runtime', region_name=region.name, config=self.config)
+            return region.client
+
+    def has_ready_region(self):
+        """True when a region is not cooling down, so a throttled call can be retried there right away"""
+        with self.lock:
+            now = time.monotonic()
+            return any(r.cooldown_until <= now for r in self.regions)
+
+    def acquire(self):
+        """Next region by smooth weighted round-robin among the regions that are not cooling down"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                healthy = [r for r in self.regions if r.cooldown_until <= now]
+                if healthy:
+                    total = sum(r.weight for r in healthy)
+                    for r in healthy:
+                        r.current_weight += r.weight
+                    chosen = max(healthy, key=lambda r: r.current_weight)
+                    chosen.current_weight -= total
+                    return chosen
+                wait = min(r.cooldown_until for r in self.regions) - now
+            time.sleep(wait)
+
+    def call(self, function):
+        """function(client) on the client of the next region, recording its latency or throttle"""
+        region = self.acquire()
+        client = self.get_client(region)
+        start = time.monotonic()
+        try:
+            result = function(client)
+        except Exception as e:
+            with self.lock:
+                region.calls += 1
+                if is_throttle(e):
+                    region.throttles += 1
+                    region.consecutive_throttles += 1
+                    cooldown = min(BASE_COOLDOWN_SECONDS * 2 ** (region.consecutive_throttles - 1), MAX_COOLDOWN_SECONDS)
+                    region.cooldown_until = time.monotonic() + cooldown
+                    print(f"Bedrock throttled in {region.name}, left out for {cooldown}s")
+                else:
+                    region.errors += 1
+            raise
+        latency = time.monotonic() - start
+        with self.lock:
+            region.calls += 1
+            region.consecutive_throttles = 0
+            region.latency_total += latency
+            region.latency_max = max(region.latency_max, latency)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {r.name: {
+                'calls': r.calls,
+                'throttles': r.throttles,
+                'errors': r.errors,
+                'average_latency_ms': round(r.latency_total * 1000 / max(r.calls - r.throttles - r.errors, 1), 1),
+                'max_latency_ms': round(r.latency_max * 1000, 1)
+            } for r in self.regions}
+
+    def publish_stats(self):
+        """Print the per-region stats since the last call in CloudWatch embedded metric format, then reset them"""
+        for name, region_stats in self.stats().items():
+            if not region_stats['calls']:
+                continue
+            print(json.dumps({
+                '_aws': {
+                    'Timestamp': int(time.time() * 1000),
+                    'CloudWatchMetrics': [{
+                        'Namespace': METRICS_NAMESPACE,
+                        'Dimensions': [['Region']],
+                        'Metrics': [
+                            {'Name': 'Calls', 'Unit': 'Count'},
+                            {'Name': 'Throttles', 'Unit': 'Count'},
+                            {'Name': 'Errors', 'Unit': 'Count'},
+                            {'Name': 'AverageLatency', 'Unit': 'Milliseconds'},
+                            {'Name': 'MaxLatency', 'Unit': 'Milliseconds'}
+                        ]
+                    }]
+                },
+                'Region': name,
+                'Calls': region_stats['calls'],
+                'Throttles': region_stats['throttles'],
+                'Errors': region_stats['errors'],
+                'AverageLatency': region_stats['average_latency_ms'],
+                'MaxLatency': region_stats['max_latency_ms']
+            }))
+        with self.lock:
+            for r in self.regions:
+                r.reset_stats()
@@ -0,0 +1,77 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# Module-level read-through caches kept across warm invocations of a Lambda container.
+#
+# Entries expire after ttl_seconds and the least recently used entry is evicted beyond max_entries.
+# Writers in the same container call invalidate() for the keys they change; other containers see the
+# change once their entry expires, so only data that tolerates ttl_seconds of staleness is cached by key.
+# Caches keyed by a version marker (see data_access.get_version) never serve stale data.
+# CACHE_TTL_SECONDS overrides the default TTL, 0 disables caching.
+
+DEFAULT_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "30"))
+DEFAULT_MAX_ENTRIES = 256
+
+caches = {}
+
+class TTLCache:
+    def __init__(self, name, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        caches[name] = self
+
+    def get(self, key):
+        """Cached value of a key, or None if it is missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.ttl_seconds <= 0 or value is None:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, refresh=False):
+        """Read-through lookup: the cached value, or loader() stored for the next calls.
+        refresh=True always calls loader, for reads that must see the latest value"""
+        value = None if refresh else self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)  # Missing items (None) are not cached
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or every entry when key is None"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.entries)}
+
+def log_stats():
+    """Print the hit/miss counters of every cache of this container"""
+    print(f"Cache stats: {json.dumps({name: c.stats() for name, c in caches.items()})}")
@@ -0,0 +1,671 @@
+import os
+import json
+import time
+import gzip
+import base64
+import threading
+import boto3
+import cache
+import serialization
+from datetime import datetime, timezone
+from boto3.dynamodb.conditions import Attr, Key
+from concurrent.futures import ThreadPoolExecutor
+
+# Data access shared by the API Lambda functions and the ECS evaluator.
+#
+# Two storage layouts are supported:
+# - Per-entity tables (default): DDBTBL_EVALUATION_REPORT, DDBTBL_EVALUATION_REPORT_QUESTIONS,
+#   DDBTBL_SCENARIOS and DDBTBL_SCENARIO_QUESTIONS.
+# - Single table (DDBTBL_DATA is set): a report or scenario and all of its questions share one partition,
+#     pk = REPORT#<report_id>     sk = METADATA | QUESTION#<question_id>
+#     pk = SCENARIO#<scenario_id> sk = METADATA | QUESTION#<question_id>
+#   so an entity and its questions load with a single paginated Query. Reports and scenarios are listed
+#   newest first through the ENTITY_INDEX global secondary index (partition key entity_type, sort key created_epoch).
+# Per-entity scenarios are listed newest first through the CREATED_INDEX global secondary index with the same keys.
+# In both layouts the questions of a report or scenario are read with a paginated Query on the parent key
+# (per-entity tables through the REPORT_QUESTIONS_INDEX / SCENARIO_QUESTIONS_INDEX global secondary indexes).
+#
+# Completed reports are also materialized as gzip JSON snapshots (the report and its prompt pairs grouped by
+# category) in the S3_REPORT_SNAPSHOTS bucket, so they load from one object instead of a Query per page.
+# DynamoDB stays the source of truth: score and comment updates patch the snapshot with conditional writes
+# (If-Match on its ETag) and delete it when the patch fails, readers recreate missing snapshots.
+# Exports of reports to CSV or Parquet (see api/export) are written to the same bucket under REPORT_EXPORT_PREFIX.
+
+class LazyClient:
+    """Stand-in for a boto3 client, resource or Table that is created on first use, so importing a handler
+    does not pay for the service models of clients it never calls (see scripts/benchmark_cold_start.py)"""
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+        return getattr(self._target, name)
+
+def lazy_table(name):
+    return LazyClient(lambda: dynamodb.Table(name)) if name else None
+
+dynamodb = LazyClient(lambda: boto3.resource('dynamodb'))
+ddbtbl_data_name = os.environ.get("DDBTBL_DATA", "")
+ddbtbl_evaluation_report_name = os.environ.get("DDBTBL_EVALUATION_REPORT", "")
+ddbtbl_evaluation_report_questions_name = os.environ.get("DDBTBL_EVALUATION_REPORT_QUESTIONS", "")
+ddbtbl_scenarios_name = os.environ.get("DDBTBL_SCENARIOS", "")
+ddbtbl_scenario_questions_name = os.environ.get("DDBTBL_SCENARIO_QUESTIONS", "")
+ddbtbl_data = lazy_table(ddbtbl_data_name)
+ddbtbl_evaluation_report = lazy_table(ddbtbl_evaluation_report_name)
+ddbtbl_evaluation_report_questions = lazy_table(ddbtbl_evaluation_report_questions_name)
+ddbtbl_scenarios = lazy_table(ddbtbl_scenarios_name)
+ddbtbl_scenario_questions = lazy_table(ddbtbl_scenario_questions_name)
+s3_client = LazyClient(lambda: boto3.client('s3'))
+
+# Scenario items rarely change after generation, reads within a warm container are served from this cache
+scenario_cache = cache.TTLCache("scenarios")
+s3_report_snapshots_name = os.environ.get("S3_REPORT_SNAPSHOTS", "")
+
+ENTITY_INDEX = "entity-index"
+CREATED_INDEX = "created-index"
+REPORT_QUESTIONS_INDEX = "report-index"
+SCENARIO_QUESTIONS_INDEX = "scenario-index"
+METADATA_SK = "METADATA"
+QUESTION_SK_PREFIX = "QUESTION#"
+SINGLE_TABLE_ATTRIBUTES = ("pk", "sk", "entity_type")
+BATCH_WRITE_MAX_RETRIES = 8
+BATCH_WRITE_CONCURRENCY = 8
+REPORT_SNAPSHOT_PREFIX = "reports/"
+REPORT_SNAPSHOT_PATCH_RETRIES = 5
+REPORT_EXPORT_PREFIX = "exports/"
+REPORT_EXPORT_URL_EXPIRY = 3600  # seconds
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # S3 parts are at least 5 MiB, except the last one
+# Rows of the report and scenario tables that are not entities: the legacy ID counter and the version marker
+RESERVED_IDS = ("counter", "version")
+# Creation datetimes have been stored in both formats
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%d-%b-%Y %I:%M:%S %p")
+
+# The one ID generator of the project: reports, scenarios, report and scenario questions and exports all get their
+# IDs from generate_id(), handlers import it from this module instead of keeping a copy
+ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+
+def generate_id():
+    """Generate a collision-free, time-sortable ID (ULID: 48-bit millisecond timestamp + 80 random bits)"""
+    value = ((time.time_ns() // 1000000) << 80) | int.from_bytes(os.urandom(10), "big")
+    return "".join(ULID_ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+def single_table():
+    return ddbtbl_data is not None
+
+def created_epoch(text):
+    """Milliseconds since the epoch of a stored creation datetime, 0 when it cannot be parsed"""
+    for datetime_format in DATETIME_FORMATS:
+        try:
+            return int(datetime.strptime(text, datetime_format).replace(tzinfo=timezone.utc).timestamp() * 1000)
+        except (ValueError, TypeError):
+            pass
+    return 0
+
+def with_sort_attributes(item, entity_type, datetime_attribute):
+    """Add the entity type and the numeric creation time used by the newest-first listing indexes"""
+    item = {**item, 'entity_type': entity_type}
+    if 'created_epoch' not in item:
+        item['created_epoch'] = created_epoch(item.get(datetime_attribute))
+    return item
+
+def encode_cursor(last_evaluated_key):
+    """Opaque pagination cursor for a LastEvaluatedKey, None on the last page"""
+    if not last_evaluated_key:
+        return None
+    key = json.dumps(last_evaluated_key, default=lambda o: int(o) if o % 1 == 0 else float(o))
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+# ----------------------------------------------------------------------------------------------------------------
+# Key and item mapping for the single-table layout
+# ----------------------------------------------------------------------------------------------------------------
+
+def report_pk(report_id):
+    return f"REPORT#{report_id}"
+
+def scenario_pk(scenario_id):
+    return f"SCENARIO#{scenario_id}"
+
+def question_sk(question_id):
+    return f"{QUESTION_SK_PREFIX}{question_id}"
+
+def report_to_single_table(item):
+    return {**with_sort_attributes(item, 'REPORT', 'datetime'), 'pk': report_pk(item['id']), 'sk': METADATA_SK}
+
+def report_question_to_single_table(item):
+    return {**item, 'pk': report_pk(item['report_id']), 'sk': question_sk(item['question_id'])}
+
+def scenario_to_single_table(item):
+    return {**with_sort_attributes(item, 'SCENARIO', 'created_datetime'), 'pk': scenario_pk(item['scenario_id']), 'sk': METADATA_SK}
+
+def scenario_question_to_single_table(item):
+    return {**item, 'pk': scenario_pk(item['scenario_id']), 'sk': question_sk(item['question_id'])}
+
+def strip_keys(item):
+    """Remove the key and index attributes so callers see the same items in both layouts"""
+    return {k: v for k, v in item.items() if k not in SINGLE_TABLE_ATTRIBUTES}
+
+# ----------------------------------------------------------------------------------------------------------------
+# Generic helpers
+# ----------------------------------------------------------------------------------------------------------------
+
+def query_pages(table, **kwargs):
+    """Run a Query and yield the items of one page at a time, so callers hold a single page in memory"""
+    response = table.query(**kwargs)
+    yield response.get('Items', [])
+    while 'LastEvaluatedKey' in response:
+        response = table.query(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
+        yield response.get('Items', [])
+
+def query_all(table, **kwargs):
+    """Run a Query and follow LastEvaluatedKey until every page has been read"""
+    return [item for page in query_pages(table, **kwargs) for item in page]
+
+def scan_pages(table, **kwargs):
+    """Run a Scan and yield the items of each page, following LastEvaluatedKey until every page has been read"""
+    response = table.scan(**kwargs)
+    yield response.get('Items', [])
+    while 'LastEvaluatedKey' in response:
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
+        yield response.get('Items', [])
+
+def scan_all(table, **kwargs):
+    """Items of every page of a Scan"""
+    return [item for page in scan_pages(table, **kwargs) for item in page]
+
+def batch_write_chunk(table, requests):
+    """Send up to 25 requests with one BatchWriteItem, retrying unprocessed items with exponential backoff"""
+    request_items = {table.name: requests}
+    for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+        response = dynamodb.batch_write_item(RequestItems=request_items)
+        request_items = response.get('UnprocessedItems', {})
+        if not request_items:
+            return
+        time.sleep(min(0.05 * (2 ** attempt), 5))
+    raise Exception(f"Unable to write {len(request_items.get(table.name, []))} items to {table.name} after {BATCH_WRITE_MAX_RETRIES} retries")
+
+def batch_write(table, requests):
+    """Send PutRequest / DeleteRequest entries with BatchWriteItem in chunks of 25,
+    up to BATCH_WRITE_CONCURRENCY chunks at a time"""
+    chunks = [requests[start:start + 25] for start in range(0, len(requests), 25)]
+    if len(chunks) <= 1:
+        for chunk in chunks:
+            batch_write_chunk(table, chunk)
+        return
+    with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_CONCURRENCY, len(chunks))) as executor:
+        for future in [executor.submit(batch_write_chunk, table, chunk) for chunk in chunks]:
+            future.result()
+
+def count_items(table, limit, **query):
+    """Count the items matched by a Query, stopping as soon as more than limit items have been counted"""
+    count = 0
+    while True:
+        response = table.query(Select='COUNT', Limit=limit + 1 - count, **query)
+        count += response['Count']
+        if count > limit or 'LastEvaluatedKey' not in response:
+            return count
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def delete_all(table, key_names, **query):
+    """Delete every item matched by a Query page by page, returning how many were deleted"""
+    deleted = 0
+    query['ProjectionExpression'] = ", ".join(f"#{name}" for name in key_names)
+    query['ExpressionAttributeNames'] = {f"#{name}": name for name in key_names}
+    while True:
+        response = table.query(**query)
+        items = response.get('Items', [])
+        batch_write(table, [{'DeleteRequest': {'Key': {name: item[name] for name in key_names}}} for item in items])
+        deleted += len(items)
+        if 'LastEvaluatedKey' not in response:
+            return deleted
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def set_expression(data):
+    """Build update_item arguments that SET every attribute in data"""
+    return {
+        'UpdateExpression': "SET " + ", ".join(f"#{k} = :{k}" for k in data.keys()),
+        'ExpressionAttributeNames': {f"#{k}": k for k in data.keys()},
+        'ExpressionAttributeValues': {f":{k}": v for k, v in data.items()}
+    }
+
+# ----------------------------------------------------------------------------------------------------------------
+# Version markers
+# ----------------------------------------------------------------------------------------------------------------
+
+def version_key(collection):
+    """Table and key of the version marker of the 'reports' or 'scenarios' collection"""
+    if single_table():
+        return ddbtbl_data, {'pk': f"VERSION#{collection}", 'sk': METADATA_SK}
+    if collection == 'reports':
+        return ddbtbl_evaluation_report, {'id': 'version'}
+    return ddbtbl_scenarios, {'scenario_id': 'version'}
+
+def bump_version(collection):
+    """Increase the version marker of a collection, called once per request that changes what list endpoints return,
+    so they can answer conditional GETs"""
+    table, key = version_key(collection)
+    table.update_item(
+        Key=key,
+        UpdateExpression='ADD #version :one SET updated_at = :updated_at',
+        ExpressionAttributeNames={'#version': 'version'},
+        ExpressionAttributeValues={':one': 1, ':updated_at': datetime.now(timezone.utc).isoformat()}
+    )
+
+def get_version(collection):
+    """Current version marker of a collection, 0 before the first write"""
+    table, key = version_key(collection)
+    item = table.get_item(Key=key).get('Item')
+    return int(item['version']) if item else 0
+
+# ----------------------------------------------------------------------------------------------------------------
+# Evaluation reports
+# ----------------------------------------------------------------------------------------------------------------
+
+def get_report(report_id):
+    if single_table():
+        item = ddbtbl_data.get_item(Key={'pk': report_pk(report_id), 'sk': METADATA_SK}).get('Item')
+        return strip_keys(item) if item else None
+    item = ddbtbl_evaluation_report.get_item(Key={'id': str(report_id)}).get('Item')
+    return strip_keys(item) if item else None
+
+def list_reports():
+    if single_table():
+        items = query_all(ddbtbl_data, IndexName=ENTITY_INDEX, KeyConditionExpression=Key('entity_type').eq('REPORT'), ScanIndexForward=False)
+        return [strip_keys(item) for item in items]
+    items = scan_all(ddbtbl_evaluation_report, FilterExpression=~Attr('id').is_in(list(RESERVED_IDS)))
+    return [strip_keys(item) for item in items]
+
+def put_report(item):
+    if single_table():
+        ddbtbl_data.put_item(Item=report_to_single_table(item))
+    else:
+        ddbtbl_evaluation_report.put_item(Item=with_sort_attributes(item, 'REPORT', 'datetime'))
+    bump_version('reports')
+
+def update_report(report_id, bump=True, **update_kwargs):
+    """update_item on a report, update_kwargs are passed through (UpdateExpression, ExpressionAttributeValues, ...).
+    bump=False leaves the version marker to a later write of the same request"""
+    if single_table():
+        response = ddbtbl_data.update_item(Key={'pk': report_pk(report_id), 'sk': METADATA_SK}, **update_kwargs)
+    else:
+        response = ddbtbl_evaluation_report.update_item(Key={'id': str(report_id)}, **update_kwargs)
+    if bump:
+        bump_version('reports')
+    return response
+
+def delete_report(report_id):
+    if single_table():
+        ddbtbl_data.delete_item(Key={'pk': report_pk(report_id), 'sk': METADATA_SK})
+    else:
+        ddbtbl_evaluation_report.delete_item(Key={'id': str(report_id)})
+    bump_version('reports')
+
+def report_questions_query(report_id):
+    """Table, key attribute names and Query arguments selecting the questions of a report"""
+    if single_table():
+        return ddbtbl_data, ('pk', 'sk'), {'KeyConditionExpression': Key('pk').eq(report_pk(report_id)) & Key('sk').begins_with(QUESTION_SK_PREFIX)}
+    return ddbtbl_evaluation_report_questions, ('question_id', 'report_id'), {'IndexName': REPORT_QUESTIONS_INDEX, 'KeyConditionExpression': Key('report_id').eq(str(report_id))}
+
+def get_report_questions(report_id):
+    table, _, query = report_questions_query(report_id)
+    return [strip_keys(item) for item in query_all(table, **query)]
+
+def iter_report_questions(report_id):
+    """Questions of a report, read one Query page at a time"""
+    table, _, query = report_questions_query(report_id)
+    for page in query_pages(table, **query):
+        for item in page:
+            yield strip_keys(item)
+
+def count_report_questions(report_id, limit):
+    """Number of questions of a report, counting stops once it exceeds limit"""
+    table, _, query = report_questions_query(report_id)
+    return count_items(table, limit, **query)
+
+def put_report_question(item):
+    """Questions are written by a running evaluation, its report changes for readers (and the version marker
+    is bumped) when the evaluation stores the score"""
+    if single_table():
+        ddbtbl_data.put_item(Item=report_question_to_single_table(item))
+    else:
+        ddbtbl_evaluation_report_questions.put_item(Item=item)
+
+def update_report_question(report_id, question_id, bump=True, **update_kwargs):
+    """bump=False leaves the version marker to a later write of the same request, e.g. patch_report_snapshot"""
+    if single_table():
+        response = ddbtbl_data.update_item(Key={'pk': report_pk(report_id), 'sk': question_sk(question_id)}, **update_kwargs)
+    else:
+        response = ddbtbl_evaluation_report_questions.update_item(Key={'question_id': question_id, 'report_id': str(report_id)}, **update_kwargs)
+    if bump:
+        bump_version('reports')
+    return response
+
+def delete_report_questions(report_id):
+    """Delete every question of a report, returning how many were deleted.
+    Callers delete or re-evaluate the report next, which bumps the version marker"""
+    table, key_names, query = report_questions_query(report_id)
+    return delete_all(table, key_names, **query)
+
+# ----------------------------------------------------------------------------------------------------------------
+# Report snapshots
+# ----------------------------------------------------------------------------------------------------------------
+
+def group_report_questions(questions):
+    """Prompt pairs of a report grouped by category, as shown by the UI"""
+    prompt_pairs = {}
+    for question in questions:
+        prompt_pairs.setdefault(question.get('category', ''), []).append({
+            'question_id': question.get('question_id'),
+            'question': question.get('question', ''),
+            'answer': question.get('answer', ''),
+            'considerations': question.get('considerations', ''),
+            'human_evaluation': question.get('human_evaluation', 'PENDING'),
+            'score': question.get('score'),  # 1-5 or null if pending
+            'comments': question.get('comments', ''),
+            'judge_model': question.get('judge_model', '')
+        })
+    return prompt_pairs
+
+def report_snapshot_key(report_id):
+    return f"{REPORT_SNAPSHOT_PREFIX}{report_id}.json.gz"
+
+def put_report_snapshot(report_id, snapshot, **condition):
+    """Store a snapshot gzip-compressed, condition is IfMatch=<etag> or IfNoneMatch='*'"""
+    body = gzip.compress(serialization.dumps_bytes(snapshot))
+    s3_client.put_object(
+        Bucket=s3_report_snapshots_name,
+        Key=report_snapshot_key(report_id),
+        Body=body,
+        ContentType='application/json',
+        ContentEncoding='gzip',
+        **condition
+    )
+    return len(body)
+
+def write_report_snapshot(report_id, report=None, questions=None, only_if_missing=False, read_version=None):
+    """Write the snapshot of a completed report, reading whatever is not passed in.
+    Readers pass only_if_missing=True and the reports version marker read before the report and its questions"""
+    if not s3_report_snapshots_name:
+        return None
+    if only_if_missing and read_version is None:
+        read_version = get_version('reports')
+    report = report or get_report(report_id)
+    if not report or not report.get('score'):
+        return None  # Evaluation still running or report deleted
+    questions = questions if questions is not None else get_report_questions(report_id)
+    snapshot = {
+        'report': report,
+        'promptPairs': group_report_questions(questions),
+        'snapshot_at': datetime.now(timezone.utc).isoformat()
+    }
+    # Readers only create missing snapshots, so they never overwrite one patched after they read DynamoDB
+    size = put_report_snapshot(report_id, snapshot, **({'IfNoneMatch': '*'} if only_if_missing else {}))
+    print(f"Wrote snapshot of report {report_id}: {len(questions)} questions, {size} bytes")
+    # An update that landed after the reads found no snapshot to patch and bumped the version marker: the snapshot
+    # may hold the data before that update, so it is left to the next reader (see patch_report_snapshot)
+    if only_if_missing and get_version('reports') != read_version:
+        print(f"Reports changed while the snapshot of report {report_id} was written, deleting it")
+        delete_report_snapshot(report_id)
+    return snapshot
+
+def get_report_snapshot_with_etag(report_id):
+    """(snapshot, ETag) of a report, or (None, None) if it has none"""
+    if not s3_report_snapshots_name:
+        return None, None
+    try:
+        response = s3_client.get_object(Bucket=s3_report_snapshots_name, Key=report_snapshot_key(report_id))
+    except s3_client.exceptions.NoSuchKey:
+        return None, None
+    return serialization.loads(gzip.decompress(response['Body'].read())), response['ETag']
+
+def get_report_snapshot(report_id):
+    """Snapshot of a report, or None if it has none"""
+    return get_report_snapshot_with_etag(report_id)[0]
+
+def patch_report_snapshot(report_id, question_id=None, question_changes=None, report_changes=None):
+    """Apply a question and/or report update to the snapshot of a report.
+    The snapshot is deleted when it cannot be patched, so readers fall back to DynamoDB and recreate it.
+    Bumps the version marker once for the request, whose DynamoDB writes pass bump=False"""
+    missing = False
+    if s3_report_snapshots_name:
+        try:
+            for _ in range(REPORT_SNAPSHOT_PATCH_RETRIES):
+                snapshot, etag = get_report_snapshot_with_etag(report_id)
+                if not snapshot:
+                    missing = True  # Recreated by the next reader
+                    break
+                snapshot['report'].update(report_changes or {})
+                for pairs in snapshot['promptPairs'].values():
+                    for pair in pairs:
+                        if pair.get('question_id') == question_id:
+                            pair.update(question_changes or {})
+                snapshot['snapshot_at'] = datetime.now(timezone.utc).isoformat()
+                try:
+                    put_report_snapshot(report_id, snapshot, IfMatch=etag)
+                    break
+                except s3_client.exceptions.ClientError as e:
+                    # Another update patched the snapshot since it was read: read it again and retry
+                    if e.response.get('Error', {}).get('Code') not in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                        raise
+            else:
+                raise RuntimeError(f"snapshot kept changing during {REPORT_SNAPSHOT_PATCH_RETRIES} attempts")
+        except Exception as e:
+            print(f"Error patching snapshot of report {report_id}: {str(e)}")
+            delete_report_snapshot(report_id)
+    # Readers that loaded the snapshot between the DynamoDB write and the patch tagged it with the version of that write
+    bump_version('reports')
+    # A reader that read DynamoDB before this update may have created the snapshot since it was found missing.
+    # Snapshots created later are checked by their reader against the version bumped above
+    if missing and report_snapshot_exists(report_id):
+        delete_report_snapshot(report_id)
+
+def report_snapshot_exists(report_id):
+    try:
+        s3_client.head_object(Bucket=s3_report_snapshots_name, Key=report_snapshot_key(report_id))
+        return True
+    except s3_client.exceptions.ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+def delete_report_snapshot(report_id):
+    if not s3_report_snapshots_name:
+        return
+    try:
+        s3_client.delete_object(Bucket=s3_report_snapshots_name, Key=report_snapshot_key(report_id))
+    except Exception as e:
+        print(f"Error deleting snapshot of report {report_id}: {str(e)}")
+
+# ----------------------------------------------------------------------------------------------------------------
+# Report exports
+# ----------------------------------------------------------------------------------------------------------------
+
+class MultipartUpload:
+    """Writable file object uploading to S3 in parts of MULTIPART_PART_SIZE bytes, so an export of any size
+    holds at most one part in memory. close() completes the upload, abort() discards the uploaded parts"""
+    def __init__(self, bucket, key, content_type):
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)['UploadId']
+        self.parts = []
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        if len(self.buffer) >= MULTIPART_PART_SIZE:
+            self.upload_part()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass  # Parts are uploaded once they are full
+
+    def upload_part(self):
+        number = len(self.parts) + 1
+        response = s3_client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=bytes(self.buffer))
+        self.parts.append({'PartNumber': number, 'ETag': response['ETag']})
+        self.buffer = bytearray()
+
+    def close(self):
+        if self.closed:
+            return
+        if self.buffer or not self.parts:
+            self.upload_part()
+        s3_client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={'Parts': self.parts})
+        self.closed = True
+
+    def abort(self):
+        if not self.closed:
+            s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.closed = True
+
+def report_export_key(export_id, extension):
+    return f"{REPORT_EXPORT_PREFIX}{export_id}.{extension}"
+
+def open_report_export(export_id, extension, content_type):
+    """MultipartUpload writing the file of an export"""
+    return MultipartUpload(s3_report_snapshots_name, report_export_key(export_id, extension), content_type)
+
+def put_report_export_status(export_id, status):
+    """Store the status of an export (RUNNING, COMPLETE or FAILED and its details) next to its file"""
+    s3_client.put_object(
+        Bucket=s3_report_snapshots_name,
+        Key=report_export_key(export_id, "json"),
+        Body=serialization.dumps_bytes(status),
+        ContentType='application/json'
+    )
+
+def get_report_export_status(export_id):
+    """Status of an export, or None if there is no such export"""
+    try:
+        response = s3_client.get_object(Bucket=s3_report_snapshots_name, Key=report_export_key(export_id, "json"))
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    return serialization.loads(response['Body'].read())
+
+def report_export_url(export_id, extension, expires_in=REPORT_EXPORT_URL_EXPIRY):
+    """Presigned GET URL of the file of an export, downloaded under its export id"""
+    return s3_client.generate_presigned_url(
+        'get_object',
+        Params={
+            'Bucket': s3_report_snapshots_name,
+            'Key': report_export_key(export_id, extension),
+            'ResponseContentDisposition': f'attachment; filename="report-export-{export_id}.{extension}"'
+        },
+        ExpiresIn=expires_in
+    )
+
+# ----------------------------------------------------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------------------------------------------------
+
+def load_scenario(scenario_id):
+    if single_table():
+        item = ddbtbl_data.get_item(Key={'pk': scenario_pk(scenario_id), 'sk': METADATA_SK}).get('Item')
+        return strip_keys(item) if item else None
+    item = ddbtbl_scenarios.get_item(Key={'scenario_id': scenario_id}).get('Item')
+    return strip_keys(item) if item else None
+
+def get_scenario(scenario_id, refresh=False):
+    """Scenario item, possibly up to cache.DEFAULT_TTL_SECONDS old unless refresh=True"""
+    item = scenario_cache.get_or_load(scenario_id, lambda: load_scenario(scenario_id), refresh=refresh)
+    return dict(item) if item else None  # Callers must not modify the cached item
+
+def scenarios_by_created_query():
+    """Table and Query arguments listing scenarios newest first"""
+    table, index = (ddbtbl_data, ENTITY_INDEX) if single_table() else (ddbtbl_scenarios, CREATED_INDEX)
+    return table, {'IndexName': index, 'KeyConditionExpression': Key('entity_type').eq('SCENARIO'), 'ScanIndexForward': False}
+
+def list_scenarios():
+    """All scenarios, newest first"""
+    table, query = scenarios_by_created_query()
+    return [strip_keys(item) for item in query_all(table, **query)]
+
+def list_scenarios_page(limit, cursor=None):
+    """One page of scenarios, newest first, and the cursor of the next page (None on the last page)"""
+    table, query = scenarios_by_created_query()
+    if cursor:
+        query['ExclusiveStartKey'] = decode_cursor(cursor)
+    response = table.query(Limit=limit, **query)
+    return [strip_keys(item) for item in response.get('Items', [])], encode_cursor(response.get('LastEvaluatedKey'))
+
+def put_scenario(item):
+    if single_table():
+        ddbtbl_data.put_item(Item=scenario_to_single_table(item))
+    else:
+        ddbtbl_scenarios.put_item(Item=with_sort_attributes(item, 'SCENARIO', 'created_datetime'))
+    scenario_cache.invalidate(item['scenario_id'])
+    bump_version('scenarios')
+
+def update_scenario(scenario_id, **update_kwargs):
+    if single_table():
+        response = ddbtbl_data.update_item(Key={'pk': scenario_pk(scenario_id), 'sk': METADATA_SK}, **update_kwargs)
+    else:
+        response = ddbtbl_scenarios.update_item(Key={'scenario_id': scenario_id}, **update_kwargs)
+    scenario_cache.invalidate(scenario_id)
+    bump_version('scenarios')
+    return response
+
+def delete_scenario(scenario_id):
+    if single_table():
+        ddbtbl_data.delete_item(Key={'pk': scenario_pk(scenario_id), 'sk': METADATA_SK})
+    else:
+        ddbtbl_scenarios.delete_item(Key={'scenario_id': scenario_id})
+    scenario_cache.invalidate(scenario_id)
+    bump_version('scenarios')
+
+def scenario_questions_query(scenario_id):
+    """Table, key attribute names and Query arguments selecting the questions of a scenario"""
+    if single_table():
+        return ddbtbl_data, ('pk', 'sk'), {'KeyConditionExpression': Key('pk').eq(scenario_pk(scenario_id)) & Key('sk').begins_with(QUESTION_SK_PREFIX)}
+    return ddbtbl_scenario_questions, ('question_id', 'scenario_id'), {'IndexName': SCENARIO_QUESTIONS_INDEX, 'KeyConditionExpression': Key('scenario_id').eq(scenario_id)}
+
+def get_scenario_questions(scenario_id):
+    table, _, query = scenario_questions_query(scenario_id)
+    return [strip_keys(item) for item in query_all(table, **query)]
+
+def count_scenario_questions(scenario_id, limit):
+    """Number of questions of a scenario, counting stops once it exceeds limit"""
+    table, _, query = scenario_questions_query(scenario_id)
+    return count_items(table, limit, **query)
+
+def put_scenario_question(item):
+    if single_table():
+        ddbtbl_data.put_item(Item=scenario_question_to_single_table(item))
+    else:
+        ddbtbl_scenario_questions.put_item(Item=item)
+
+def put_scenario_questions(items):
+    """Write many scenario questions with BatchWriteItem"""
+    if single_table():
+        batch_write(ddbtbl_data, [{'PutRequest': {'Item': scenario_question_to_single_table(item)}} for item in items])
+    else:
+        batch_write(ddbtbl_scenario_questions, [{'PutRequest': {'Item': item}} for item in items])
+
+def update_scenario_question(scenario_id, question_id, **update_kwargs):
+    if single_table():
+        return ddbtbl_data.update_item(Key={'pk': scenario_pk(scenario_id), 'sk': question_sk(question_id)}, **update_kwargs)
+    return ddbtbl_scenario_questions.update_item(Key={'question_id': question_id, 'scenario_id': scenario_id}, **update_kwargs)
+
+def delete_scenario_question(scenario_id, question_id):
+    if single_table():
+        ddbtbl_data.delete_item(Key={'pk': scenario_pk(scenario_id), 'sk': question_sk(question_id)})
+    else:
+        ddbtbl_scenario_questions.delete_item(Key={'question_id': question_id, 'scenario_id': scenario_id})
+
+def delete_scenario_questions(scenario_id):
+    """Delete every question of a scenario, returning how many were deleted"""
+    table, key_names, query = scenario_questions_query(scenario_id)
+    return delete_all(table, key_names, **query)
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import random
+import threading
+import data_access
+from decimal import Decimal
+
+# Token buckets shared by every process that calls Bedrock (evaluator tasks, the evaluator worker and the
+# new-scenario Lambda), so concurrent evaluations stay under the account quota together instead of each
+# retrying against it.
+#
+# A bucket is one item of the DDBTBL_RATE_LIMITS table ({limiter_id, tokens, updated_at}), refilled at
+# BEDROCK_RATE_LIMIT_RPM * RATE_LIMIT_HEADROOM requests per minute and holding at most BURST_SECONDS of them.
+# Processes lease tokens in batches (one GetItem and one conditional UpdateItem per lease, retried when another
+# process updated the bucket in between) and hand them out to their threads locally. A lease asks for as many
+# tokens as threads are waiting, at most MAX_LEASE, and is granted what the bucket holds, so no process can
+# drain the bucket ahead of the others; tokens not used within LEASE_SECONDS are dropped rather than kept for
+# a later burst. When the bucket is empty, processes poll again once a token has accrued, with random jitter
+# so the next token goes to a random waiting process.
+# Without a table or with a rate of 0 the limiter is disabled, DynamoDB errors let requests through.
+
+ddbtbl_rate_limits = data_access.lazy_table(os.environ.get("DDBTBL_RATE_LIMITS", ""))
+DEFAULT_REQUESTS_PER_MINUTE = float(os.environ.get("BEDROCK_RATE_LIMIT_RPM", "0"))
+RATE_LIMIT_HEADROOM = 0.9  # Share of the quota the fleet may use, the rest absorbs clock skew and other callers
+BURST_SECONDS = 5
+MAX_LEASE = 5
+LEASE_SECONDS = 2
+LEASE_RETRIES = 5
+
+limiters = {}
+limiters_lock = threading.Lock()
+
+class RateLimiter:
+    def __init__(self, name, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+        self.name = name
+        self.rate = requests_per_minute * RATE_LIMIT_HEADROOM / 60  # tokens per second
+        self.capacity = max(self.rate * BURST_SECONDS, 1)
+        self.enabled = ddbtbl_rate_limits is not None and self.rate > 0
+        self.lock = threading.Lock()
+        self.lease_lock = threading.Lock()  # One lease request per process at a time
+        self.tokens = 0
+        self.lease_expires = 0.0
+        self.waiting = 0
+        self.acquired = 0
+        self.leases = 0
+        self.conflicts = 0
+        self.wait_seconds = 0.0
+
+    def take_local(self):
+        with self.lock:
+            if self.tokens and time.monotonic() < self.lease_expires:
+                self.tokens -= 1
+                self.acquired += 1
+                return True
+            return False
+
+    def lease(self, count):
+        """Take up to count tokens from the shared bucket: (tokens granted, seconds until the next token)"""
+        for _ in range(LEASE_RETRIES):
+            now = time.time()
+            item = ddbtbl_rate_limits.get_item(Key={'limiter_id': self.name}, ConsistentRead=True).get('Item')
+            if item:
+                updated_at = float(item['updated_at'])
+                available = min(self.capacity, float(item['tokens']) + max(now - updated_at, 0) * self.rate)
+            else:
+                updated_at = None
+                available = self.capacity
+            # A bucket holding less than a full lease is contended: one token per lease, so it is shared by the
+            # processes polling it rather than taken by whichever asks for the most
+            granted = min(count, int(available)) if available >= MAX_LEASE else min(1, int(available))
+            if not granted:
+                return 0, (1 - available) / self.rate + random.uniform(0, 1 / self.rate)
+
+            values = {':tokens': Decimal(str(round(available - granted, 3))), ':now': Decimal(str(round(max(now, updated_at or 0), 3)))}
+            try:
+                if item:
+                    ddbtbl_rate_limits.update_item(
+                        Key={'limiter_id': self.name},
+                        UpdateExpression="SET tokens = :tokens, updated_at = :now",
+                        ConditionExpression="updated_at = :previous",
+                        ExpressionAttributeValues={**values, ':previous': item['updated_at']}
+                    )
+                else:
+                    ddbtbl_rate_limits.put_item(
+                        Item={'limiter_id': self.name, 'tokens': values[':tokens'], 'updated_at': values[':now']},
+                        ConditionExpression="attribute_not_exists(limiter_id)"
+                    )
+                return granted, 0
+            except Exception as e:
+                if getattr(e, 'response', {}).get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+                # Another process leased in between, read the bucket again
+                with self.lock:
+                    self.conflicts += 1
+                time.sleep(random.uniform(0, 0.05))
+        return 0, random.uniform(0, 1 / self.rate)
+
+    def acquire(self):
+        """Block until this process may send one request"""
+        if not self.enabled:
+            return
+        started = time.monotonic()
+        with self.lock:
+            self.waiting += 1
+        try:
+            while not self.take_local():
+                with self.lease_lock:
+                    # Another thread may have leased while this one waited for the lease lock
+                    if self.take_local():
+                        break
+                    with self.lock:
+                        count = min(max(self.waiting, 1), MAX_LEASE)
+                    try:
+                        granted, wait = self.lease(count)
+                    except Exception as e:
+                        print(f"Rate limiter {self.name} unavailable, request let through: {str(e)}")
+                        granted, wait = count, 0
+                    with self.lock:
+                        self.leases += 1
+                        self.tokens = granted
+                        self.lease_expires = time.monotonic() + LEASE_SECONDS
+                    if wait:
+                        # The lease lock is held, so the other threads of this process wait without polling DynamoDB
+                        time.sleep(wait)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+                self.wait_seconds += time.monotonic() - started
+
+    def stats(self):
+        with self.lock:
+            return {'acquired': self.acquired, 'leases': self.leases, 'conflicts': self.conflicts, 'wait_seconds': round(self.wait_seconds, 1)}
+
+def get_limiter(name):
+    """Limiter of a bucket, created on first use and shared by all threads of the process"""
+    with limiters_lock:
+        if name not in limiters:
+            limiters[name] = RateLimiter(name)
+        return limiters[name]
+
+def acquire(name):
+    get_limiter(name).acquire()
+
+def acquire_bedrock(model_id):
+    """Wait for a request to a Bedrock model, quotas are per model so each model has its own bucket"""
+    acquire(f"bedrock#{model_id}")
+
+def log_stats():
+    """Print the counters of every limiter of this process"""
+    print(f"Rate limiter stats: {json.dumps({name: limiter.stats() for name, limiter in limiters.items() if limiter.enabled})}")
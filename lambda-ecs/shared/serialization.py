@@ -0,0 +1,37 @@
+import json
+from decimal import Decimal
+
+# JSON encoding of DynamoDB items (numbers come back as Decimal) for API responses and report snapshots.
+#
+# orjson is used when the layer provides it (layers/requirements.txt), the standard library otherwise.
+# Both call decimal_default for Decimal values only; everything else is encoded natively.
+# Compare the encoders on large report fixtures with scripts/benchmark_serialization.py.
+
+try:
+    import orjson
+except ImportError:  # e.g. a layer built for another platform, or scripts run locally
+    orjson = None
+
+ENCODER = "orjson" if orjson else "json"
+
+def decimal_default(obj):
+    """JSON serializer for objects not serializable by default json code"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError
+
+def dumps_bytes(obj):
+    """Compact UTF-8 JSON encoding of obj"""
+    if orjson:
+        return orjson.dumps(obj, default=decimal_default)
+    return json.dumps(obj, default=decimal_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def loads(data):
+    """Decode JSON text or UTF-8 bytes"""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def dumps(obj):
+    """Compact JSON text of obj, e.g. an API Gateway response body"""
+    if orjson:
+        return orjson.dumps(obj, default=decimal_default).decode('utf-8')
+    return json.dumps(obj, default=decimal_default, separators=(',', ':'), ensure_ascii=False)
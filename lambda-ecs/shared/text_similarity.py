@@ -0,0 +1,25 @@
+import re
+import math
+import hashlib
+from collections import Counter
+
+# Text normalization and similarity shared by the evaluator (duplicate answers, refusal detection)
+# and the report comparison API. All functions run in time linear in the length of the text.
+
+def normalize_text(text):
+    """Lowercase, strip punctuation and collapse whitespace so trivially different texts compare equal"""
+    text = re.sub(r"[^\w\s]", " ", str(text).lower())
+    return " ".join(text.split())
+
+def text_hash(*parts):
+    """Short stable hash of the normalized parts, e.g. the category and question used to join two reports"""
+    normalized = "\x00".join(normalize_text(part) for part in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+def term_vector(text):
+    return Counter(normalize_text(text).split())
+
+def cosine_similarity(vector_a, vector_b):
+    dot = sum(count * vector_b.get(term, 0) for term, count in vector_a.items())
+    norm = math.sqrt(sum(c * c for c in vector_a.values())) * math.sqrt(sum(c * c for c in vector_b.values()))
+    return dot / norm if norm else 0.0
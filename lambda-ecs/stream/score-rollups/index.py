@@ -0,0 +1,224 @@
+import json
+import os
+import sys
+import time
+import boto3
+import data_access
+from datetime import datetime, timezone
+from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+# Consumes the DynamoDB streams of the evaluation report and evaluation report question tables (or of the
+# single table) and keeps score rollups up to date in the DDBTBL_SCORE_ROLLUPS table:
+#   rollup_id = <dimension>#<value>   bucket = <YYYY-MM-DD> | ALL
+# for the dimensions all, scenario, endpoint, pillar and scenario-pillar. Each rollup item holds
+# report_count, question_count, evaluated_count, score_sum and the score histogram hist_1 .. hist_5.
+#
+# Every stream record is applied in one transaction together with a marker item for its eventID,
+# so records delivered again after a retry are skipped.
+#
+# Recorded stream events can be replayed locally without writing anything:
+#   python index.py events/sample-stream-events.json
+
+dynamodb_client = boto3.client('dynamodb')
+ddbtbl_score_rollups_name = os.environ.get("DDBTBL_SCORE_ROLLUPS", "")
+
+deserializer = TypeDeserializer()
+serializer = TypeSerializer()
+
+ALL_BUCKET = "ALL"
+META_BUCKET = "META"
+EVENT_BUCKET = "EVENT"
+EVENT_MARKER_TTL = 2 * 24 * 3600  # Stream records are retained for 24 hours
+REPORT_META_TTL = 7 * 24 * 3600  # Keep the report dimensions for question deletes that arrive after the report delete
+SCORE_VALUES = range(1, 6)
+
+def deserialize(image):
+    return {k: deserializer.deserialize(v) for k, v in (image or {}).items()}
+
+def serialize(item):
+    return {k: serializer.serialize(v) for k, v in item.items()}
+
+def record_kind(item):
+    """'report', 'question' or None for the items this consumer does not roll up"""
+    if 'pk' in item:
+        if not str(item['pk']).startswith("REPORT#"):
+            return None
+        return 'report' if item.get('sk') == data_access.METADATA_SK else 'question'
+    if 'question_id' in item and 'report_id' in item:
+        return 'question'
+    if 'id' in item and item['id'] not in data_access.RESERVED_IDS:
+        return 'report'
+    return None
+
+def report_day(report, record):
+    """Day of the evaluation, from the report datetime or else the time of the stream record"""
+    try:
+        return datetime.strptime(report.get('datetime', ''), "%d-%b-%Y %I:%M:%S %p").strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        created = record.get('dynamodb', {}).get('ApproximateCreationDateTime', time.time())
+        return datetime.fromtimestamp(float(created), tz=timezone.utc).strftime("%Y-%m-%d")
+
+def report_meta(report, record):
+    return {
+        'scenario_id': report.get('scenario_id', ''),
+        'endpoint': report.get('endpoint', ''),
+        'day': report_day(report, record)
+    }
+
+def report_dimensions(meta):
+    dimensions = ["all#all"]
+    if meta.get('scenario_id'):
+        dimensions.append(f"scenario#{meta['scenario_id']}")
+    if meta.get('endpoint'):
+        dimensions.append(f"endpoint#{meta['endpoint']}")
+    return dimensions
+
+def question_dimensions(meta, category):
+    dimensions = report_dimensions(meta)
+    if category:
+        dimensions.append(f"pillar#{category}")
+        if meta.get('scenario_id'):
+            dimensions.append(f"scenario-pillar#{meta['scenario_id']}#{category}")
+    return dimensions
+
+def question_contribution(question, sign):
+    """Counters a question adds to (sign=1) or removes from (sign=-1) its rollups"""
+    score = min(max(int(question.get('score') or 1), 1), 5)
+    return {
+        'question_count': sign,
+        'evaluated_count': sign if question.get('human_evaluation') == 'EVALUATED' else 0,
+        'score_sum': sign * score,
+        f"hist_{score}": sign
+    }
+
+def add_deltas(deltas, dimensions, day, counters):
+    for rollup_id in dimensions:
+        for bucket in (day, ALL_BUCKET):
+            target = deltas.setdefault((rollup_id, bucket), {})
+            for name, value in counters.items():
+                target[name] = target.get(name, 0) + value
+
+def rollup_deltas(record, get_meta):
+    """Rollup counter changes for one stream record: ({(rollup_id, bucket): {counter: delta}}, report meta to store).
+    get_meta(report_id) returns the stored dimensions of a report"""
+    old = deserialize(record['dynamodb'].get('OldImage'))
+    new = deserialize(record['dynamodb'].get('NewImage'))
+    kind = record_kind(new or old)
+    deltas = {}
+    meta_item = None
+
+    if kind == 'report':
+        report = new or old
+        meta = report_meta(report, record)
+        if record['eventName'] == 'INSERT':
+            add_deltas(deltas, report_dimensions(meta), meta['day'], {'report_count': 1})
+        elif record['eventName'] == 'REMOVE':
+            add_deltas(deltas, report_dimensions(meta), meta['day'], {'report_count': -1})
+        meta_item = {'report_id': str(report['id']), **meta}
+        if record['eventName'] == 'REMOVE':
+            meta_item['ttl_timestamp'] = int(time.time()) + REPORT_META_TTL
+
+    elif kind == 'question':
+        meta = get_meta(str((new or old)['report_id']))
+        if old:
+            add_deltas(deltas, question_dimensions(meta, old.get('category', '')), meta['day'], question_contribution(old, -1))
+        if new:
+            add_deltas(deltas, question_dimensions(meta, new.get('category', '')), meta['day'], question_contribution(new, 1))
+
+    # Drop counters that cancel out, e.g. a comment being saved on a question
+    deltas = {key: {k: v for k, v in counters.items() if v} for key, counters in deltas.items()}
+    return {key: counters for key, counters in deltas.items() if counters}, meta_item
+
+def get_report_meta(report_id):
+    """Stored dimensions of a report, read from the report itself the first time; raises when the report is missing"""
+    response = dynamodb_client.get_item(
+        TableName=ddbtbl_score_rollups_name,
+        Key=serialize({'rollup_id': f"report#{report_id}", 'bucket': META_BUCKET})
+    )
+    if 'Item' in response:
+        return deserialize(response['Item'])
+    report = data_access.get_report(report_id)
+    if not report:
+        # Not stored as empty dimensions: the record is retried (up to the retry attempts of the event source)
+        # once the report is readable or its META item has been written by the report's own stream record
+        raise Exception(f"Report {report_id} not found, its dimensions are unknown")
+    meta = report_meta(report, {})
+    dynamodb_client.put_item(
+        TableName=ddbtbl_score_rollups_name,
+        Item=serialize({'rollup_id': f"report#{report_id}", 'bucket': META_BUCKET, 'report_id': report_id, **meta})
+    )
+    return meta
+
+def build_transaction(record, deltas, meta_item):
+    """TransactWriteItems entries applying the deltas of a record exactly once"""
+    items = [{
+        'Put': {
+            'TableName': ddbtbl_score_rollups_name,
+            'Item': serialize({'rollup_id': f"event#{record['eventID']}", 'bucket': EVENT_BUCKET, 'ttl_timestamp': int(time.time()) + EVENT_MARKER_TTL}),
+            'ConditionExpression': 'attribute_not_exists(rollup_id)'
+        }
+    }]
+    if meta_item:
+        items.append({
+            'Put': {
+                'TableName': ddbtbl_score_rollups_name,
+                'Item': serialize({'rollup_id': f"report#{meta_item['report_id']}", 'bucket': META_BUCKET, **meta_item})
+            }
+        })
+    for (rollup_id, bucket), counters in deltas.items():
+        dimension, value = rollup_id.split("#", 1)
+        items.append({
+            'Update': {
+                'TableName': ddbtbl_score_rollups_name,
+                'Key': serialize({'rollup_id': rollup_id, 'bucket': bucket}),
+                'UpdateExpression': "SET #dimension = :dimension, #value = :value ADD " + ", ".join(f"#{k} :{k}" for k in counters),
+                'ExpressionAttributeNames': {'#dimension': 'dimension', '#value': 'value', **{f"#{k}": k for k in counters}},
+                'ExpressionAttributeValues': serialize({':dimension': dimension, ':value': value, **{f":{k}": v for k, v in counters.items()}})
+            }
+        })
+    return items
+
+def apply_record(record):
+    deltas, meta_item = rollup_deltas(record, get_report_meta)
+    if not deltas and not meta_item:
+        return
+    try:
+        dynamodb_client.transact_write_items(TransactItems=build_transaction(record, deltas, meta_item))
+    except dynamodb_client.exceptions.TransactionCanceledException as e:
+        reasons = e.response.get('CancellationReasons', [])
+        if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            print(f"Skipping already applied record {record['eventID']}")
+            return
+        raise
+
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    for record in records:
+        try:
+            apply_record(record)
+        except Exception as e:
+            print(f"Error applying record {record.get('eventID')}: {str(e)}")
+            # Retry from the failed record, the records before it are not applied again
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
+    print(f"Applied {len(records)} stream records")
+    return {'batchItemFailures': []}
+
+def replay(path):
+    """Print the rollup changes of recorded stream events without writing them"""
+    with open(path) as f:
+        records = json.load(f).get('Records', [])
+    metas = {}
+    totals = {}
+    for record in records:
+        deltas, meta_item = rollup_deltas(record, lambda report_id: metas.get(report_id, {'day': 'unknown'}))
+        if meta_item:
+            metas[meta_item['report_id']] = meta_item
+        for key, counters in deltas.items():
+            target = totals.setdefault(f"{key[0]} / {key[1]}", {})
+            for name, value in counters.items():
+                target[name] = target.get(name, 0) + value
+    print(json.dumps(totals, indent=4, sort_keys=True, default=lambda o: int(o) if isinstance(o, Decimal) else str(o)))
+
+if __name__ == "__main__":
+    replay(sys.argv[1])
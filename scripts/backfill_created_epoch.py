@@ -0,0 +1,54 @@
+"""Add the numeric creation time (created_epoch) and entity type used by the newest-first listing indexes
+to reports and scenarios written before they existed, and store scenario creation datetimes in one format.
+
+Usage:
+    uv run python scripts/backfill_created_epoch.py --stack-name rai-01-storage [--single-table] [--dry-run]
+
+Items that already have created_epoch are left untouched, so the script can be re-run safely.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+
+SCENARIO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill created_epoch on reports and scenarios")
+    parser.add_argument("--stack-name", default="rai-01-storage", help="Name of the storage stack")
+    parser.add_argument("--single-table", action="store_true", help="Backfill the single table instead of the per-entity tables")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the items that would be updated")
+    args = parser.parse_args()
+
+    # The data access module reads the table names from the environment when it is imported
+    if args.single_table:
+        os.environ["DDBTBL_DATA"] = f"{args.stack_name}-data"
+    os.environ["DDBTBL_EVALUATION_REPORT"] = f"{args.stack_name}-evaluation-report"
+    os.environ["DDBTBL_SCENARIOS"] = f"{args.stack_name}-scenarios"
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda-ecs", "shared"))
+    import data_access
+    from boto3.dynamodb.conditions import Attr
+
+    if args.single_table:
+        # Only report and scenario metadata, not the VERSION# and other reserved rows that share the sort key
+        entities = Attr('pk').begins_with(data_access.report_pk("")) | Attr('pk').begins_with(data_access.scenario_pk(""))
+        items = data_access.scan_all(data_access.ddbtbl_data, FilterExpression=Attr('sk').eq(data_access.METADATA_SK) & entities & Attr('created_epoch').not_exists())
+        targets = [(item, data_access.ddbtbl_data, {'pk': item['pk'], 'sk': item['sk']}, item['pk'].split("#", 1)[0]) for item in items]
+    else:
+        reports = data_access.scan_all(data_access.ddbtbl_evaluation_report, FilterExpression=~Attr('id').is_in(list(data_access.RESERVED_IDS)) & Attr('created_epoch').not_exists())
+        scenarios = data_access.scan_all(data_access.ddbtbl_scenarios, FilterExpression=~Attr('scenario_id').is_in(list(data_access.RESERVED_IDS)) & Attr('created_epoch').not_exists())
+        targets = [(item, data_access.ddbtbl_evaluation_report, {'id': item['id']}, 'REPORT') for item in reports]
+        targets += [(item, data_access.ddbtbl_scenarios, {'scenario_id': item['scenario_id']}, 'SCENARIO') for item in scenarios]
+    print(f"{len(targets)} items without created_epoch")
+
+    for item, table, key, entity_type in targets:
+        datetime_attribute = 'created_datetime' if entity_type == 'SCENARIO' else 'datetime'
+        data = {'entity_type': entity_type, 'created_epoch': data_access.created_epoch(item.get(datetime_attribute))}
+        if entity_type == 'SCENARIO' and data['created_epoch']:
+            data['created_datetime'] = datetime.fromtimestamp(data['created_epoch'] / 1000, tz=timezone.utc).strftime(SCENARIO_DATETIME_FORMAT)
+        print(f"{key}: {data}")
+        if not args.dry_run:
+            table.update_item(Key=key, **data_access.set_expression(data))
+
+if __name__ == "__main__":
+    main()
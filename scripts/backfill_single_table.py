@@ -0,0 +1,49 @@
+"""Copy reports, scenarios and their questions from the per-entity DynamoDB tables into the single table.
+
+Usage (after deploying with the cdk.json context "single_table": true):
+    uv run python scripts/backfill_single_table.py --stack-name rai-01-storage
+
+The copy is idempotent (items are overwritten with the same keys), so it can be re-run while the
+per-entity tables are still in use and once more after the Lambda functions have switched over.
+Each Scan page is written before the next one is read, so memory use does not grow with the table size.
+"""
+import argparse
+import os
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the single DynamoDB table from the per-entity tables")
+    parser.add_argument("--stack-name", default="rai-01-storage", help="Name of the storage stack")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the items that would be copied")
+    args = parser.parse_args()
+
+    # The data access module reads the table names from the environment when it is imported
+    os.environ["DDBTBL_DATA"] = f"{args.stack_name}-data"
+    os.environ["DDBTBL_EVALUATION_REPORT"] = f"{args.stack_name}-evaluation-report"
+    os.environ["DDBTBL_EVALUATION_REPORT_QUESTIONS"] = f"{args.stack_name}-evaluation-report-questions"
+    os.environ["DDBTBL_SCENARIOS"] = f"{args.stack_name}-scenarios"
+    os.environ["DDBTBL_SCENARIO_QUESTIONS"] = f"{args.stack_name}-scenario-questions"
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda-ecs", "shared"))
+    import data_access
+    from boto3.dynamodb.conditions import Attr
+
+    sources = [
+        ("evaluation reports", data_access.ddbtbl_evaluation_report, "id", data_access.report_to_single_table),
+        ("evaluation report questions", data_access.ddbtbl_evaluation_report_questions, "question_id", data_access.report_question_to_single_table),
+        ("scenarios", data_access.ddbtbl_scenarios, "scenario_id", data_access.scenario_to_single_table),
+        ("scenario questions", data_access.ddbtbl_scenario_questions, "question_id", data_access.scenario_question_to_single_table),
+    ]
+    for label, table, key_name, to_single_table in sources:
+        # Skip the legacy ID counter and version marker rows. Items are copied one Scan page at a time, so large
+        # tables are not held in memory
+        count = 0
+        with data_access.ddbtbl_data.batch_writer() as writer:
+            for page in data_access.scan_pages(table, FilterExpression=~Attr(key_name).is_in(list(data_access.RESERVED_IDS))):
+                count += len(page)
+                if not args.dry_run:
+                    for item in page:
+                        writer.put_item(Item=to_single_table(item))
+        print(f"{label}: {count} items in {table.name}" + ("" if args.dry_run else f", copied to {data_access.ddbtbl_data.name}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Measure the import (init phase) cost of every Lambda handler and of the evaluator.
+
+Each handler module is imported in a fresh interpreter with `-X importtime`, against dummy AWS
+credentials and an unreachable endpoint so nothing is called, and the script records:
+    init_ms     time to import the handler module (what the Lambda init phase spends on it)
+    max_rss_kb  peak resident memory of the interpreter after the import
+    top imports the imported packages with the largest cumulative import time
+The median of --runs runs is reported per handler.
+
+Usage:
+    uv run python scripts/benchmark_cold_start.py [--runs 5] [--only results,evaluate]
+    uv run python scripts/benchmark_cold_start.py --save-baseline scripts/cold_start_baseline.json
+    uv run python scripts/benchmark_cold_start.py --baseline scripts/cold_start_baseline.json [--threshold 0.2]
+
+With --baseline, handlers whose init time or memory grew by more than --threshold (and by more than
+--min-init-ms / --min-rss-kb) are flagged and the script exits with status 1.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+HANDLER_GLOBS = ["lambda-ecs/api/*/index.py", "lambda-ecs/stream/*/index.py", "lambda-ecs/custom/*/index.py", "lambda-ecs/evaluator/index.py"]
+TOP_IMPORTS = 8
+
+# Table, bucket and cluster names are only read at import time, the values do not matter
+STAND_IN_ENVIRONMENT = {
+    "AWS_REGION": "us-east-1",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "AWS_ENDPOINT_URL": "http://127.0.0.1:9",  # Any call that slips through fails instead of reaching AWS
+    "DDBTBL_EVALUATION_REPORT": "benchmark-evaluation-report",
+    "DDBTBL_EVALUATION_REPORT_QUESTIONS": "benchmark-evaluation-report-questions",
+    "DDBTBL_SCENARIOS": "benchmark-scenarios",
+    "DDBTBL_SCENARIO_QUESTIONS": "benchmark-scenario-questions",
+    "DDBTBL_SCORE_ROLLUPS": "benchmark-score-rollups",
+    "S3_REPORT_SNAPSHOTS": "benchmark-report-snapshots",
+    "ECS_CLUSTER": "benchmark",
+    "ECS_TASK_DEFINITION": "benchmark",
+    "ECS_SUBNET": "benchmark",
+    "ECS_SECURITY_GROUP": "benchmark",
+    "ECS_CONTAINER_NAME": "benchmark",
+    "APIKEY_ID": "benchmark",
+    "API_ENDPOINT": "https://benchmark",
+    "WEBAPP_S3BUCKET": "benchmark",
+}
+
+# Runs in the child interpreter: import the handler, then report the init time and peak memory
+CHILD_SCRIPT = """
+import importlib.util, json, resource, sys, time
+sys.stderr.write("HANDLER IMPORT\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("index", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+init_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({"init_ms": init_ms, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "modules": len(sys.modules)}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+def handler_name(path):
+    return os.path.relpath(os.path.dirname(path), os.path.join(REPO_ROOT, "lambda-ecs"))
+
+def find_handlers(only):
+    paths = sorted(p for pattern in HANDLER_GLOBS for p in glob.glob(os.path.join(REPO_ROOT, pattern)))
+    if only:
+        paths = [p for p in paths if os.path.basename(os.path.dirname(p)) in only]
+    return paths
+
+def top_imports(stderr):
+    """Top-level imports with the largest cumulative time, from the -X importtime output"""
+    imports = []
+    # Skip the interpreter start-up and the imports of the measuring script
+    for line in stderr.split("HANDLER IMPORT\n", 1)[-1].splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:  # One space: imported directly, not by another module
+            imports.append((int(match.group(2)) / 1000, match.group(4)))
+    return [{"module": name, "cumulative_ms": round(ms, 1)} for ms, name in sorted(imports, reverse=True)[:TOP_IMPORTS]]
+
+def measure(path, single_table):
+    """One import of a handler in a fresh interpreter"""
+    environment = {"PATH": os.environ.get("PATH", ""), **STAND_IN_ENVIRONMENT}
+    if single_table:
+        environment["DDBTBL_DATA"] = "benchmark-data"
+    # Same module search path as in Lambda: the function code, then the layer (shared modules and dependencies)
+    python_path = [os.path.dirname(path), os.path.join(REPO_ROOT, "lambda-ecs", "shared"), os.path.join(REPO_ROOT, "layers", "python"), os.path.join(REPO_ROOT, "layers-export", "python")]
+    python_path += [p for p in sys.path if p.endswith("site-packages")]
+    environment["PYTHONPATH"] = os.pathsep.join(python_path)
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT, path], env=environment, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit status {result.returncode}")
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement["top_imports"] = top_imports(result.stderr)
+    return measurement
+
+def benchmark(path, runs, single_table):
+    """Median of several imports of a handler"""
+    measurements = [measure(path, single_table) for _ in range(runs)]
+    median = sorted(measurements, key=lambda m: m["init_ms"])[len(measurements) // 2]
+    return {
+        "init_ms": round(statistics.median(m["init_ms"] for m in measurements), 1),
+        "max_rss_kb": int(statistics.median(m["max_rss_kb"] for m in measurements)),
+        "modules": median["modules"],
+        "top_imports": median["top_imports"]
+    }
+
+def find_regressions(results, baseline, threshold, min_init_ms, min_rss_kb):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "error" in result:
+            continue
+        for metric, minimum in (("init_ms", min_init_ms), ("max_rss_kb", min_rss_kb)):
+            growth = result[metric] - base[metric]
+            if growth > minimum and growth > base[metric] * threshold:
+                regressions.append(f"{name}: {metric} {base[metric]} -> {result[metric]} (+{growth / base[metric]:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import cost of the Lambda handlers")
+    parser.add_argument("--runs", type=int, default=5, help="Imports per handler, the median is reported")
+    parser.add_argument("--only", default="", help="Comma-separated handler directory names")
+    parser.add_argument("--single-table", action="store_true", help="Import with DDBTBL_DATA set")
+    parser.add_argument("--json", help="Write the full results to this file")
+    parser.add_argument("--save-baseline", help="Write init_ms and max_rss_kb per handler to this file")
+    parser.add_argument("--baseline", help="Compare with a file written by --save-baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative growth flagged as a regression")
+    parser.add_argument("--min-init-ms", type=float, default=10, help="Init time growth below this is never flagged")
+    parser.add_argument("--min-rss-kb", type=int, default=2048, help="Memory growth below this is never flagged")
+    args = parser.parse_args()
+
+    only = {name for name in args.only.split(",") if name}
+    results = {}
+    print(f"{'handler':<40} {'init ms':>9} {'rss MB':>8} {'modules':>8}  top imports (cumulative ms)")
+    for path in find_handlers(only):
+        name = handler_name(path)
+        try:
+            result = benchmark(path, args.runs, args.single_table)
+        except RuntimeError as e:
+            results[name] = {"error": str(e)}
+            print(f"{name:<40} failed: {e}")
+            continue
+        results[name] = result
+        top = ", ".join(f"{i['module']} {i['cumulative_ms']}" for i in result["top_imports"][:4])
+        print(f"{name:<40} {result['init_ms']:>9.1f} {result['max_rss_kb'] / 1024:>8.1f} {result['modules']:>8}  {top}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({name: {"init_ms": r["init_ms"], "max_rss_kb": r["max_rss_kb"]} for name, r in results.items() if "error" not in r}, f, indent=4, sort_keys=True)
+        print(f"Baseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold, args.min_init_ms, args.min_rss_kb)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
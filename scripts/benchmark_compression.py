@@ -0,0 +1,90 @@
+"""Measure how well /results responses compress, to choose the API Gateway compression threshold.
+
+The responses are built with the fixture of scripts/benchmark_serialization.py, with the answers and
+considerations replaced by pseudo-random sentences (repeated text would compress far better than real
+model output), and encoded by lambda-ecs/shared/serialization.py as the handlers do.
+For each response size and codec the script reports:
+    bytes        compressed size (and the ratio to the uncompressed body)
+    compress ms  time to compress (what API Gateway adds before sending the response)
+    inflate ms   time to decompress (what the browser adds before parsing)
+    transfer ms  estimated download time of the body at --mbps
+Codecs measured: identity, gzip and deflate (the encodings API Gateway negotiates), and brotli only
+when the brotli package is installed, for comparison.
+
+Usage:
+    uv run python scripts/benchmark_compression.py [--sizes 0x0,1x1,1x10,1x50,10x250] [--mbps 20] [--runs 5]
+"""
+import argparse
+import gzip
+import random
+import statistics
+import time
+import zlib
+
+from benchmark_serialization import PILLARS, build_reports, serialization
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WORDS = ("the assistant customer account policy request data personal response model refuses explains "
+         "disclosure verification step bank loan credit card fee dispute fraud alert consent privacy safety "
+         "bias answer context detail review escalation agent support transfer balance statement limit risk").split()
+
+def vary_text(response, seed=7):
+    """Replace the repeated fixture text with distinct pseudo-random sentences"""
+    rng = random.Random(seed)
+    sentence = lambda: " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + ". "
+    for report in response['message']:
+        for pairs in report['promptPairs'].values():
+            for pair in pairs:
+                pair['answer'] = "".join(sentence() for _ in range(rng.randint(3, 8)))
+                pair['considerations'] = "".join(sentence() for _ in range(rng.randint(2, 5)))
+    return response
+
+def codecs():
+    """Name -> (compress, decompress)"""
+    available = {
+        "identity": (lambda b: b, lambda b: b),
+        "gzip -1": (lambda b: gzip.compress(b, compresslevel=1), gzip.decompress),
+        "gzip -6": (lambda b: gzip.compress(b, compresslevel=6), gzip.decompress),
+        "gzip -9": (lambda b: gzip.compress(b, compresslevel=9), gzip.decompress),
+        "deflate": (zlib.compress, zlib.decompress),
+    }
+    if brotli:
+        available["brotli -5"] = (lambda b: brotli.compress(b, quality=5), brotli.decompress)
+        available["brotli -11"] = (lambda b: brotli.compress(b, quality=11), brotli.decompress)
+    return available
+
+def median_ms(function, argument, runs):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function(argument)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compression of /results responses")
+    parser.add_argument("--sizes", default="0x0,1x1,1x10,1x50,10x250", help="Comma-separated <reports>x<questions per pillar> responses")
+    parser.add_argument("--mbps", type=float, default=20, help="Download bandwidth for the transfer estimate")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per codec, the median is reported")
+    args = parser.parse_args()
+
+    print(f"serialization module encoder: {serialization.ENCODER}, brotli: {'installed' if brotli else 'not installed'}")
+    print(f"{'response':<24} {'codec':<11} {'bytes':>11} {'ratio':>7} {'compress ms':>12} {'inflate ms':>11} {'transfer ms':>12}")
+    for size in args.sizes.split(","):
+        reports, questions = (int(n) for n in size.split("x"))
+        body = serialization.dumps_bytes(vary_text(build_reports(reports, questions)))
+        label = f"{reports}x{len(PILLARS)}x{questions} ({len(body) / 1024:.0f} KiB)"
+        for name, (compress, decompress) in codecs().items():
+            compress_ms, compressed = median_ms(compress, body, args.runs)
+            inflate_ms, inflated = median_ms(decompress, compressed, args.runs)
+            assert inflated == body
+            transfer_ms = len(compressed) * 8 / (args.mbps * 1000)
+            print(f"{label:<24} {name:<11} {len(compressed):>11} {len(body) / len(compressed):>6.1f}x {compress_ms:>12.2f} {inflate_ms:>11.2f} {transfer_ms:>12.1f}")
+            label = ""
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare JSON encoders on a /results response built from a large report fixture.
+
+Encoders measured (orjson only when it is installed):
+    json+default    json.dumps(default=decimal_default), the encoding used by the handlers before
+    serialization   lambda-ecs/shared/serialization.dumps as deployed (orjson if available, else compact json)
+    json compact    the standard library fallback of the serialization module
+    orjson          orjson.dumps(default=decimal_default)
+
+Usage:
+    uv run python scripts/benchmark_serialization.py [--reports 10] [--questions 250] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda-ecs", "shared"))
+import serialization
+
+PILLARS = ["Fairness", "Explainability", "Privacy and security", "Safety", "Controllability", "Veracity and robustness", "Governance", "Transparency"]
+
+def build_reports(report_count, questions_per_pillar):
+    """Reports shaped like the /results response, with DynamoDB Decimal numbers"""
+    reports = []
+    for r in range(report_count):
+        prompt_pairs = {}
+        for pillar in PILLARS:
+            prompt_pairs[pillar] = [{
+                'question_id': f"01JBENCH{r:04d}{q:06d}",
+                'question': f"How does the assistant handle request {q} about {pillar.lower()} for a customer account?",
+                'answer': "Thank you for your question. " + "The assistant explains the policy and the next steps in detail. " * 6,
+                'considerations': "The response is accurate and avoids disclosing personal data. " * 3 + "<verification>Check the disclosure wording.</verification>",
+                'human_evaluation': 'EVALUATED' if q % 3 == 0 else 'PENDING',
+                'score': Decimal(q % 5 + 1),
+                'comments': "Reviewed" if q % 7 == 0 else ""
+            } for q in range(questions_per_pillar)]
+        reports.append({
+            'id': f"01JBENCH{r:04d}",
+            'name': f"Benchmark report {r}",
+            'datetime': "18-Feb-2025 11:56:00 PM",
+            'created_epoch': Decimal(1739922960000 + r),
+            'score': "2.4",
+            'score_breakdown': {pillar: "2.4" for pillar in PILLARS},
+            'judge_stats': {'questions': Decimal(questions_per_pillar * len(PILLARS)), 'judge_calls': Decimal(questions_per_pillar * 6), 'coalesced': Decimal(12)},
+            'promptPairs': prompt_pairs
+        })
+    return {'message': reports}
+
+def time_encoder(encode, data, runs):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = encode(data)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding of large /results responses")
+    parser.add_argument("--reports", type=int, default=10, help="Reports in the response")
+    parser.add_argument("--questions", type=int, default=250, help="Questions per pillar and report")
+    parser.add_argument("--runs", type=int, default=5, help="Encodings per encoder, the median is reported")
+    args = parser.parse_args()
+
+    data = build_reports(args.reports, args.questions)
+    print(f"{args.reports} reports x {len(PILLARS)} pillars x {args.questions} questions, serialization module encoder: {serialization.ENCODER}")
+
+    encoders = {
+        "json+default": lambda d: json.dumps(d, default=serialization.decimal_default),
+        "serialization": serialization.dumps,
+        "json compact": lambda d: json.dumps(d, default=serialization.decimal_default, separators=(',', ':'), ensure_ascii=False),
+    }
+    if serialization.orjson:
+        encoders["orjson"] = lambda d: serialization.orjson.dumps(d, default=serialization.decimal_default)
+
+    baseline_ms = None
+    print(f"{'encoder':<16} {'median ms':>10} {'bytes':>12} {'speedup':>8}")
+    for name, encode in encoders.items():
+        median_ms, size = time_encoder(encode, data, args.runs)
+        baseline_ms = baseline_ms or median_ms
+        print(f"{name:<16} {median_ms:>10.1f} {size:>12} {baseline_ms / median_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
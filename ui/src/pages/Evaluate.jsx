@@ -17,6 +17,9 @@ import { Add as AddIcon, Remove as RemoveIcon, Help as HelpIcon } from '@mui/ico
 import { useLocation } from "react-router-dom";
 import axios from 'axios';
 
+// Scenarios are loaded newest first, one page at a time
+const SCENARIO_PAGE_SIZE = 25;
+const LOAD_MORE_SCENARIOS = '__load_more__';
 
 const Evaluate = () => {
   const navigate = useNavigate();
@@ -36,38 +39,52 @@ const Evaluate = () => {
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [scenarios, setScenarios] = useState([]);
   const [selectedScenario, setSelectedScenario] = useState('');
+  const [scenariosCursor, setScenariosCursor] = useState(null);
 
   useEffect(() => { // set API endpoint & API key from environment
     setApiEndpoint(window.env.API_GATEWAY_ENDPOINT.replace(/^https:\/\//, ''))
     setApiKey(window.env.API_GATEWAY_APIKEY)
   }, []);
 
-  // Fetch scenarios from API
-  useEffect(() => {
-    const fetchScenarios = async () => {
-      try {
-        const response = await fetch(`${window.env.API_GATEWAY_ENDPOINT}/list-scenarios`, {
-          method: 'GET',
-          headers: {
-            'Content-Type': 'application/json',
-            'x-api-key': window.env.API_GATEWAY_APIKEY,
-          }
-        });
+  // Fetch a page of scenarios from API
+  const fetchScenarios = async (cursor = null) => {
+    try {
+      const params = new URLSearchParams({ limit: SCENARIO_PAGE_SIZE });
+      if (cursor) {
+        params.append('cursor', cursor);
+      }
+      const response = await fetch(`${window.env.API_GATEWAY_ENDPOINT}/list-scenarios?${params}`, {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+          'x-api-key': window.env.API_GATEWAY_APIKEY,
+        }
+      });
 
-        if (response.ok) {
-          const data = await response.json();
-          if (data.scenarios) {
-            setScenarios(data.scenarios);
-          }
+      if (response.ok) {
+        const data = await response.json();
+        if (data.scenarios) {
+          setScenarios((previous) => (cursor ? [...previous, ...data.scenarios] : data.scenarios));
+          setScenariosCursor(data.next_cursor || null);
         }
-      } catch (err) {
-        console.error('Error fetching scenarios:', err);
       }
-    };
+    } catch (err) {
+      console.error('Error fetching scenarios:', err);
+    }
+  };
 
+  useEffect(() => {
     fetchScenarios();
   }, []);
 
+  const handleScenarioChange = (value) => {
+    if (value === LOAD_MORE_SCENARIOS) {
+      fetchScenarios(scenariosCursor);
+      return;
+    }
+    setSelectedScenario(value);
+  };
+
   useEffect(() => {
     if (location.state != undefined) {
       setHeaders(location.state.headers)
@@ -286,7 +303,7 @@ const Evaluate = () => {
               <InputLabel>Select Scenario</InputLabel>
               <Select
                 value={selectedScenario}
-                onChange={(e) => setSelectedScenario(e.target.value)}
+                onChange={(e) => handleScenarioChange(e.target.value)}
                 label="Select Scenario"
                 required
               >
@@ -295,6 +312,11 @@ const Evaluate = () => {
                     {scenario.name}
                   </MenuItem>
                 ))}
+                {scenariosCursor && (
+                  <MenuItem value={LOAD_MORE_SCENARIOS}>
+                    <em>Load more scenarios...</em>
+                  </MenuItem>
+                )}
               </Select>
             </FormControl>
             <Tooltip title="Select a pre-defined scenario to use its custom evaluation questions">
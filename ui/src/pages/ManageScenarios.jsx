@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import {
   Box,
@@ -21,6 +21,9 @@ import {
   DialogActions
 } from '@mui/material';
 import { Edit as EditIcon, Delete as DeleteIcon, Refresh } from '@mui/icons-material';
+import { PILLAR_DEFINITIONS } from '../constants/pillars';
+
+const PILLAR_COUNT = Object.keys(PILLAR_DEFINITIONS).length;
 
 const ManageScenarios = () => {
   const navigate = useNavigate();
@@ -35,6 +38,7 @@ const ManageScenarios = () => {
     scenarioName: ''
   });
   const [deleting, setDeleting] = useState(false);
+  const scenariosEtag = useRef(null); // ETag of the last /list-scenarios response, sent back as If-None-Match
 
   // Fetch scenarios from API
   const fetchScenarios = useCallback(async (isRefresh = false) => {
@@ -52,13 +56,19 @@ const ManageScenarios = () => {
         headers: {
           'Content-Type': 'application/json',
           'x-api-key': window.env.API_GATEWAY_APIKEY,
+          ...(scenariosEtag.current ? { 'If-None-Match': scenariosEtag.current } : {}),
         }
       });
 
+      if (response.status === 304) {
+        return; // Nothing changed since the last load
+      }
+
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
+      scenariosEtag.current = response.headers.get('ETag');
       const data = await response.json();
       console.log('Scenarios response:', data);
 
@@ -254,15 +264,21 @@ const ManageScenarios = () => {
                         color={
                           scenario.status === 'COMPLETED' ? 'success' :
                             scenario.status === 'PROCESSING' ? 'warning' :
-                              scenario.status === 'FAILED' ? 'error' : 'default'
+                              scenario.status === 'PARTIAL' ? 'info' :
+                                scenario.status === 'FAILED' ? 'error' : 'default'
                         }
                         size="small"
                         sx={{ minWidth: 80 }}
                       />
-                      {scenario.status === 'FAILED' && scenario.error_message && (
+                      {scenario.status === 'PROCESSING' && (
+                        <Typography variant="caption" color="text.secondary" sx={{ display: 'block', mt: 0.5 }}>
+                          {scenario.generated_count || 0} / {scenario.questionsPerCategory * PILLAR_COUNT} questions
+                        </Typography>
+                      )}
+                      {(scenario.status === 'FAILED' || scenario.status === 'PARTIAL') && scenario.error_message && (
                         <Tooltip title={scenario.error_message}>
-                          <Typography variant="caption" color="error" sx={{ display: 'block', mt: 0.5 }}>
-                            Error
+                          <Typography variant="caption" color={scenario.status === 'FAILED' ? 'error' : 'text.secondary'} sx={{ display: 'block', mt: 0.5 }}>
+                            {scenario.status === 'FAILED' ? 'Error' : `${scenario.generated_count || 0} / ${scenario.questionsPerCategory * PILLAR_COUNT} questions`}
                           </Typography>
                         </Tooltip>
                       )}
@@ -416,6 +416,7 @@ const Results = () => {
   const circularChartRefs = useRef({});
   const [editingComments, setEditingComments] = useState({}); // Track which comments are being edited
   const commentRefs = useRef({}); // Refs to access textarea values directly
+  const resultsEtag = useRef(null); // ETag of the last /results response, sent back as If-None-Match
 
   useEffect(() => { // set API endpoint & API key from environment
     setApiEndpoint(window.env.API_GATEWAY_ENDPOINT.replace(/^https:\/\//, ''))
@@ -432,8 +433,14 @@ const Results = () => {
         const responseData = await axios.get(`https://${apiEndpoint}/results`, {
           headers: {
             'x-api-key': apiKey,
+            ...(resultsEtag.current ? { 'If-None-Match': resultsEtag.current } : {}),
           },
+          validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
         });
+        if (responseData.status === 304) {
+          return; // Nothing changed since the last load
+        }
+        resultsEtag.current = responseData.headers.etag || null;
         const sortedData = responseData.data.message.sort((a, b) => {
           return new Date(b.datetime) - new Date(a.datetime);
         });
@@ -569,8 +576,15 @@ const Results = () => {
           const responseData = await axios.get(`https://${apiEndpoint}/results`, {
             headers: {
               'x-api-key': apiKey,
+              ...(resultsEtag.current ? { 'If-None-Match': resultsEtag.current } : {}),
             },
+            validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
           });
+          if (responseData.status === 304) {
+            setLoading(false);
+            return; // Nothing changed since the last load
+          }
+          resultsEtag.current = responseData.headers.etag || null;
           const sortedData = responseData.data.message.sort((a, b) => {
             return new Date(b.datetime) - new Date(a.datetime);
           });